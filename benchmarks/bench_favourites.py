@@ -0,0 +1,70 @@
+"""
+Per-operation latency of the favourites store on a large table.
+
+    python benchmarks/bench_favourites.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import favourites
+import storage
+
+CITIES = ["Stockholm", "Oslo", "Helsinki", "Copenhagen", "Berlin", "Paris", "Madrid", "Rome"]
+
+
+def _fill(rows: int) -> int:
+    users = rows // favourites.MAX_CITIES
+    with storage.connect() as conn:
+        conn.executemany(
+            "INSERT INTO favourites (user_id, city) VALUES (?, ?)",
+            ((user_id, city) for user_id in range(users) for city in CITIES[:favourites.MAX_CITIES]),
+        )
+    return users
+
+
+def _time(label: str, ops: int, fn) -> None:
+    started = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28}{elapsed / ops * 1e6:9.1f} us/op")
+
+
+def main(rows: int, ops: int) -> None:
+    storage.DB_PATH = Path(tempfile.mkdtemp()) / "bench.db"
+    storage.migrate()
+    started = time.perf_counter()
+    users = _fill(rows)
+    print(f"filled {users * favourites.MAX_CITIES} rows in {time.perf_counter() - started:.1f}s")
+
+    with storage.connect() as conn:
+        for sql in (
+            "SELECT city FROM favourites WHERE user_id = 1 ORDER BY saved_at, rowid",
+            "DELETE FROM favourites WHERE user_id = 1 AND city = 'x' COLLATE NOCASE",
+        ):
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+            print(f"plan: {' | '.join(row['detail'] for row in plan)}")
+
+    rng = random.Random(1)
+    _time("get_cities", ops, lambda: favourites.get_cities.sync(rng.randrange(users)))
+    _time("save_city (limit_reached)", ops, lambda: favourites.save_city.sync(rng.randrange(users), "Tokyo"))
+    _time("save_city (duplicate)", ops, lambda: favourites.save_city.sync(rng.randrange(users), "oslo"))
+    new_users = iter(range(users, users + ops))
+    _time("save_city (saved)", ops, lambda: favourites.save_city.sync(next(new_users), "Tokyo"))
+    new_users = iter(range(users, users + ops))
+    _time("remove_city", ops, lambda: favourites.remove_city.sync(next(new_users), "TOKYO"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--ops", type=int, default=5_000)
+    args = parser.parse_args()
+    main(args.rows, args.ops)
@@ -0,0 +1,119 @@
+"""
+Memory held by a response cache of 100k current-weather readings. The last row
+fills weather_cache through the real fetch path, with the network stubbed out.
+
+    python benchmarks/bench_memory.py --readings 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import NamedTuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("OPEN_WEATHER_API_TOKEN", "bench")
+
+import weather_api_service as api
+from cache import TTLCache
+from weather_api_service import WeatherType, get_weather
+
+CITIES = [("Stockholm", "SE"), ("Oslo", "NO"), ("Berlin", "DE"), ("Tokyo", "JP"), ("Lima", "PE")]
+
+
+class LegacyWeather(NamedTuple):
+    """The previous layout: datetime sun times and per-reading string copies."""
+    temperature: float
+    feels_like: float
+    temperature_min: float
+    temperature_max: float
+    humidity: int
+    weather_type: WeatherType
+    sunrise: datetime
+    sunset: datetime
+    city: str
+    country: str
+    wind_speed: float = 0.0
+    pressure: int = 0
+
+
+def _response(rng: random.Random) -> dict:
+    city, country = rng.choice(CITIES)
+    sunrise = 1772686800 + rng.randrange(3600)
+    # "".join copies the name, as a JSON decoder would for each response
+    return {
+        "coord": {"lon": rng.uniform(-180, 180), "lat": rng.uniform(-90, 90)},
+        "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04d"}],
+        "base": "stations",
+        "main": {"temp": rng.uniform(-20, 35), "feels_like": rng.uniform(-25, 35),
+                 "temp_min": rng.uniform(-20, 30), "temp_max": rng.uniform(-10, 35),
+                 "pressure": rng.randrange(980, 1040), "humidity": rng.randrange(100)},
+        "visibility": 10000,
+        "wind": {"speed": rng.uniform(0, 20), "deg": rng.randrange(360)},
+        "clouds": {"all": 75},
+        "dt": sunrise + 20000,
+        "sys": {"type": 2, "id": 1788, "country": "".join(country), "sunrise": sunrise, "sunset": sunrise + 40000},
+        "timezone": 3600,
+        "id": rng.randrange(10_000_000),
+        "name": "".join(city),
+        "cod": 200,
+    }
+
+
+def _legacy(response: dict) -> LegacyWeather:
+    weather = get_weather(response)
+    return LegacyWeather(*weather[:6], datetime.fromtimestamp(weather.sunrise),
+                         datetime.fromtimestamp(weather.sunset), "".join(response["name"]),
+                         "".join(response["sys"]["country"]), *weather[10:])
+
+
+def _measure(label: str, readings: int, build) -> None:
+    rng = random.Random(1)
+    tracemalloc.start()
+    cache = TTLCache(ttl=600, maxsize=readings)
+    for i in range(readings):
+        # only what the cache keeps alive is still traced at the end
+        cache.set(i, build(_response(rng)))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    _report(label, readings, size)
+
+
+def _measure_weather_cache(readings: int) -> None:
+    rng = random.Random(1)
+
+    async def fake_fetch(url: str) -> dict:
+        return _response(rng)
+
+    async def fill() -> None:
+        for i in range(readings):
+            await api.get_current_weather(i / 100, 0.0)
+
+    api.weather_cache.maxsize = readings
+    api._fetch_json = fake_fetch
+    tracemalloc.start()
+    asyncio.run(fill())
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(api.weather_cache) == readings
+    _report("weather_cache", readings, size)
+
+
+def _report(label: str, readings: int, size: int) -> None:
+    print(f"{label:<28}{size / 2**20:8.1f} MiB  {size / readings:6.0f} B/reading")
+
+
+def main(readings: int) -> None:
+    _measure("raw response dicts", readings, lambda r: r)
+    _measure("Weather, legacy layout", readings, _legacy)
+    _measure("Weather", readings, get_weather)
+    _measure_weather_cache(readings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readings", type=int, default=100_000)
+    main(parser.parse_args().readings)
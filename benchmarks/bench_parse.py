@@ -0,0 +1,54 @@
+"""
+CPU cost of decoding and parsing recorded OpenWeather payloads (tests/fixtures).
+
+    python benchmarks/bench_parse.py --iterations 20000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import weather_api_service as api
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _time(label: str, iterations: int, fn) -> None:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<36}{elapsed / iterations * 1e6:9.2f} us")
+
+
+def main(iterations: int) -> None:
+    print(f"json_loads in use: {api.json_loads.__module__}")
+    payloads = {name: (FIXTURES / f"{name}.json").read_bytes() for name in ("weather", "air_pollution", "forecast")}
+    parsers = {
+        "weather": api.get_weather,
+        "air_pollution": api.get_air_quality_type,
+        "forecast": api.parse_forecast,
+    }
+    for name, body in payloads.items():
+        print(f"\n{name} ({len(body)} bytes)")
+        _time("decode: json", iterations, lambda: json.loads(body))
+        if orjson is not None:
+            _time("decode: orjson", iterations, lambda: orjson.loads(body))
+        decoded = api.json_loads(body)
+        _time("parse", iterations, lambda: parsers[name](decoded))
+        _time("decode + parse", iterations, lambda: parsers[name](api.json_loads(body)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20_000)
+    main(parser.parse_args().iterations)
@@ -0,0 +1,76 @@
+"""
+Renders per second for the weather_repr formatting paths.
+
+    python benchmarks/bench_render.py --renders 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import weather_repr
+from timezoneutils import SunTime
+from weather_api_service import AirQualityType, Coordinates, ForecastDay, Weather, WeatherReport, WeatherType
+
+CITIES = [("Stockholm", "SE"), ("Oslo", "NO"), ("Berlin", "DE"), ("Tokyo", "JP"), ("Lima", "PE")]
+
+
+def _weather(rng: random.Random) -> Weather:
+    city, country = rng.choice(CITIES)
+    noon = 1772712000  # 2026-03-05 12:00 UTC
+    return Weather(
+        temperature=round(rng.uniform(-20, 35), 2),
+        feels_like=round(rng.uniform(-25, 35), 2),
+        temperature_min=round(rng.uniform(-20, 30), 2),
+        temperature_max=round(rng.uniform(-10, 35), 2),
+        humidity=rng.randrange(100),
+        weather_type=rng.choice(list(WeatherType)),
+        sunrise=noon - 6 * 3600,
+        sunset=noon + 6 * 3600,
+        city=city,
+        country=country,
+        wind_speed=round(rng.uniform(0, 20), 1),
+        pressure=rng.randrange(980, 1040),
+    )
+
+
+def _rate(label: str, renders: int, fn) -> None:
+    started = time.perf_counter()
+    for i in range(renders):
+        fn(i)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32}{renders / elapsed:12,.0f} renders/s")
+
+
+def main(renders: int) -> None:
+    rng = random.Random(1)
+    distinct = [_weather(rng) for _ in range(renders)]
+    popular = distinct[:50]
+    sun = SunTime(sunrise=datetime(2026, 3, 5, 6, 41), sunset=datetime(2026, 3, 5, 17, 52))
+    reports = [
+        WeatherReport(weather=w, air_quality=AirQualityType.FAIR, coordinates=Coordinates(59.33, 18.06))
+        for w in popular
+    ]
+    days = tuple(
+        ForecastDay(date=f"2026-03-0{d}", temperature_min=-2.0, temperature_max=4.5,
+                    weather_type=WeatherType.SNOW, wind_speed=3.1)
+        for d in range(5, 10)
+    )
+
+    weather_repr.weather_repr.cache_clear()
+    _rate("weather_repr (all distinct)", renders, lambda i: weather_repr.weather_repr(distinct[i]))
+    _rate("weather_repr (50 popular)", renders, lambda i: weather_repr.weather_repr(popular[i % 50]))
+    _rate("report_repr (50 popular)", renders,
+          lambda i: weather_repr.report_repr(reports[i % 50], "Europe", "12:00", sun))
+    _rate("inline_repr (50 popular)", renders, lambda i: weather_repr.inline_repr(popular[i % 50]))
+    _rate("forecast_repr (5 days)", renders, lambda i: weather_repr.forecast_repr(days, "Stockholm", "SE"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=100_000)
+    main(parser.parse_args().renders)
@@ -0,0 +1,49 @@
+"""
+Compares the H3 index against TimezoneFinder.certain_timezone_at.
+Build the index first: python tz_index.py
+
+    python benchmarks/bench_tz_index.py --points 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from timezonefinder import TimezoneFinder
+
+import tz_index
+
+
+def main(points: int, seed: int) -> None:
+    if not tz_index.load():
+        sys.exit("tz_index.npy not found — run `python tz_index.py` first")
+    rng = random.Random(seed)
+    coords = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(points)]
+    finder = TimezoneFinder()
+
+    started = time.perf_counter()
+    expected = [finder.certain_timezone_at(lat=lat, lng=lon) for lat, lon in coords]
+    finder_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indexed = [tz_index.lookup(lat, lon) for lat, lon in coords]
+    index_seconds = time.perf_counter() - started
+
+    answered = [(i, e) for i, e in zip(indexed, expected) if i is not None]
+    mismatches = sum(1 for i, e in answered if i != e)
+    print(f"points:             {points}")
+    print(f"certain_timezone_at {finder_seconds / points * 1e6:9.1f} us/lookup")
+    print(f"tz_index.lookup     {index_seconds / points * 1e6:9.1f} us/lookup")
+    print(f"answered by index   {len(answered) / points:9.1%}")
+    print(f"mismatches          {mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    main(args.points, args.seed)
@@ -0,0 +1,85 @@
+import time
+from enum import Enum
+from typing import Awaitable, Callable, TypeVar
+
+from exceptions import UpstreamUnavailable
+
+T = TypeVar("T")
+
+# Consecutive failures that open the circuit
+FAILURE_THRESHOLD = 5
+# Seconds the circuit stays open before a probe is let through
+RESET_TIMEOUT = 30
+# Concurrent probe requests allowed while half-open
+HALF_OPEN_PROBES = 1
+
+
+class BreakerState(Enum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitBreaker:
+    """
+    Fails fast while an upstream is down. After ``failure_threshold`` failures in a row
+    the circuit opens and calls raise UpstreamUnavailable without being made; after
+    ``reset_timeout`` seconds a few probe calls go through, and one success closes it again.
+    """
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT, half_open_probes: int = HALF_OPEN_PROBES):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = BreakerState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened = 0
+        self.rejected = 0
+
+    def _allow(self) -> bool:
+        if self.state is BreakerState.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = BreakerState.HALF_OPEN
+            self._probes = 0
+        if self.state is BreakerState.HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                return False
+            self._probes += 1
+        return True
+
+    def _open(self) -> None:
+        self.state = BreakerState.OPEN
+        self._opened_at = time.monotonic()
+        self.opened += 1
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self.state = BreakerState.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state is BreakerState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open()
+
+    async def call(self, fn: Callable[[], Awaitable[T]], failures: tuple[type[BaseException], ...] = (Exception,)) -> T:
+        """Runs ``fn`` unless the circuit is open; exceptions in ``failures`` count against it."""
+        if not self._allow():
+            self.rejected += 1
+            raise UpstreamUnavailable
+        half_open = self.state is BreakerState.HALF_OPEN
+        try:
+            result = await fn()
+        except failures:
+            self.record_failure()
+            raise
+        except BaseException:
+            # cancelled: neither outcome, but free the probe slot
+            if half_open:
+                self._probes -= 1
+            raise
+        self.record_success()
+        return result
@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Protocol
+
+# Coordinates are rounded to this many decimals (~1.1 km) before keying
+COORD_PRECISION = 2
+
+
+def city_key(city: str) -> str:
+    """Normalizes a city name so 'new  York ' and 'New York' share an entry."""
+    return " ".join(city.split()).casefold()
+
+
+def coords_key(latitude: float, longitude: float, precision: int = COORD_PRECISION) -> tuple[float, float]:
+    """Rounds coordinates so nearby points share an entry."""
+    return round(latitude, precision), round(longitude, precision)
+
+
+class CacheBackend(Protocol):
+    """What the fetch layer needs from a response cache. TTLCache is the in-process backend."""
+
+    name: str
+    ttl: float
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        ...
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        ...
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries expire ``ttl`` seconds after being set.
+    Expired entries stay readable through get_stale for ``stale_ttl`` more seconds.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024, name: str = "", stale_ttl: float = 0):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            if expires_at + self.stale_ttl <= now:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Returns the value, even if expired, while inside its stale window. Use after get() misses."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at + self.stale_ttl <= time.monotonic():
+            del self._data[key]
+            return None
+        self.stale_hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Stores a value for ``ttl`` seconds (default: the cache's TTL),
+        evicting the least recently used entries over maxsize.
+        """
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+        }
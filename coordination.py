@@ -0,0 +1,82 @@
+import os
+import socket
+import time
+import uuid
+from typing import Protocol
+
+import storage
+
+# A leader must renew before this many seconds pass or another worker takes over
+LEASE_SECONDS = 90
+
+
+class Leadership(Protocol):
+    """Decides which worker runs singleton work such as subscription delivery."""
+
+    async def acquire(self) -> bool:
+        """Take or renew leadership. Returns True while this worker is the leader."""
+        ...
+
+    async def release(self) -> None:
+        ...
+
+
+class LocalLeadership:
+    """Single-worker deployments: this process is always the leader."""
+
+    async def acquire(self) -> bool:
+        return True
+
+    async def release(self) -> None:
+        pass
+
+
+@storage.threaded
+def _acquire_lease(name: str, owner: str, now: float, lease_seconds: float) -> bool:
+    with storage.connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                owner      = excluded.owner,
+                expires_at = excluded.expires_at
+            WHERE leases.owner = excluded.owner OR leases.expires_at < ?
+            """,
+            (name, owner, now + lease_seconds, now),
+        )
+        row = conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+    return row is not None and row["owner"] == owner
+
+
+@storage.threaded
+def _release_lease(name: str, owner: str) -> None:
+    with storage.connect() as conn:
+        conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+
+class SQLiteLease:
+    """
+    Leader lease stored in the shared SQLite database.
+    Works for workers on one host sharing the database file.
+    """
+
+    def __init__(self, name: str = "scheduler", lease_seconds: float = LEASE_SECONDS):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self) -> bool:
+        return await _acquire_lease(self.name, self.owner, time.time(), self.lease_seconds)
+
+    async def release(self) -> None:
+        await _release_lease(self.name, self.owner)
+
+
+def leadership_from_env() -> Leadership:
+    """LEADER_BACKEND=sqlite (default) or local."""
+    backend = os.getenv("LEADER_BACKEND", "sqlite")
+    if backend == "local":
+        return LocalLeadership()
+    if backend == "sqlite":
+        return SQLiteLease()
+    raise RuntimeError(f"Unknown LEADER_BACKEND: {backend}")
@@ -5,3 +5,7 @@ class ApiServiceError(Exception):
 
 class WrongInput(Exception):
     """Bot could not find the city. Check the spelling"""
+
+
+class UpstreamUnavailable(ApiServiceError):
+    """OpenWeather keeps failing; requests are paused for a while"""
@@ -0,0 +1,29 @@
+"""
+Forecast service: one cached 5-day / 3-hour series per location, parsed once
+per refresh into slots (for hourly views) and daily summaries (for /forecast).
+"""
+from typing import Optional
+
+from exceptions import WrongInput
+from weather_api_service import (
+    Coordinates,
+    Forecast,
+    get_forecast_by_coords,
+    get_forecast_response,
+)
+
+async def get_forecast(coordinates: Coordinates, name: Optional[str] = None,
+                       country: Optional[str] = None) -> Forecast:
+    """Forecast at coordinates, optionally labelled with a known city name and country."""
+    forecast = await get_forecast_by_coords(coordinates.latitude, coordinates.longitude)
+    if name is not None:
+        forecast = forecast._replace(city=name, country=country or forecast.country)
+    return forecast
+
+
+async def get_city_forecast(city: str) -> Forecast:
+    """Forecast for a city name OpenWeather resolves. Raises WrongInput if it does not."""
+    try:
+        return await get_forecast_response(city)
+    except WrongInput:
+        raise WrongInput(f'City "{city}" is not defined')
@@ -0,0 +1,201 @@
+"""
+Offline gazetteer: normalized city names and aliases -> canonical name,
+country and coordinates, so typed cities resolve without a geocoding call.
+
+The bundled data/cities.csv is compiled into data/gazetteer.bin (at image build
+time in Docker, otherwise whenever the CSV is newer) and memory-mapped. Layout, little-endian:
+
+    header   magic, place count P, key count K                         <4sII
+    places   P x lat, lon, population, name offset, name length, ISO  <ddIIH2s
+    keys     K x key offset, key length, place index                  <IHI, sorted by key bytes
+    strings  UTF-8 blob that names and keys point into
+
+Lookups binary-search the key table in place; nothing but the header is parsed at load.
+
+    python gazetteer.py    # rebuild by hand
+"""
+import bisect
+import csv
+import functools
+import mmap
+import os
+import struct
+import tempfile
+import unicodedata
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from cache import city_key
+from weather_api_service import Coordinates
+
+CITIES_PATH = Path(__file__).parent / "data" / "cities.csv"
+INDEX_PATH = Path(__file__).parent / "data" / "gazetteer.bin"
+
+_MAGIC = b"GAZ2"
+_HEADER = struct.Struct("<4sII")
+_PLACE = struct.Struct("<ddIIH2s")
+_KEY = struct.Struct("<IHI")
+
+
+class Place(NamedTuple):
+    id: int             # row in the CSV, stable while the file is unchanged
+    name: str
+    country: str
+    latitude: float
+    longitude: float
+    population: int = 0     # approximate, only used to rank suggestions
+
+    @property
+    def coordinates(self) -> Coordinates:
+        return Coordinates(self.latitude, self.longitude)
+
+
+def normalize(name: str) -> str:
+    """Like city_key, and also drops accents: 'São Paulo' -> 'sao paulo'."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    return city_key("".join(c for c in decomposed if not unicodedata.combining(c)))
+
+
+def build(cities_path: Path = CITIES_PATH, index_path: Path = INDEX_PATH) -> None:
+    """Compiles the CSV into the binary index, replacing the old one atomically."""
+    places, keys = [], set()
+    with open(cities_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            place_id = len(places)
+            places.append((float(row["lat"]), float(row["lon"]), int(row["population"]),
+                           row["name"], row["country"]))
+            for name in [row["name"], *filter(None, row["aliases"].split("|"))]:
+                keys.add((normalize(name).encode(), place_id))
+
+    strings = bytearray()
+
+    def intern(value: bytes) -> tuple[int, int]:
+        offset = len(strings)
+        strings.extend(value)
+        return offset, len(value)
+
+    place_table = bytearray()
+    for latitude, longitude, population, name, country in places:
+        offset, length = intern(name.encode())
+        place_table += _PLACE.pack(latitude, longitude, population, offset, length, country.encode()[:2])
+    key_table = bytearray()
+    for key, place_id in sorted(keys):
+        offset, length = intern(key)
+        key_table += _KEY.pack(offset, length, place_id)
+
+    # a unique name, so workers starting together each write their own copy
+    fd, tmp_path = tempfile.mkstemp(dir=index_path.parent, prefix=f".{index_path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(places), len(keys)))
+            f.write(place_table)
+            f.write(key_table)
+            f.write(strings)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class Gazetteer:
+    """Read-only view over a memory-mapped index file."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.place_count, self.key_count = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path.name} is not a gazetteer index")
+        self._places_at = _HEADER.size
+        self._keys_at = self._places_at + self.place_count * _PLACE.size
+        self._strings_at = self._keys_at + self.key_count * _KEY.size
+        self.place = functools.lru_cache(maxsize=None)(self._place)
+
+    def __len__(self) -> int:
+        return self.key_count
+
+    def _string(self, offset: int, length: int) -> bytes:
+        start = self._strings_at + offset
+        return self._buf[start:start + length]
+
+    def _entry(self, i: int) -> tuple[bytes, int]:
+        offset, length, place_id = _KEY.unpack_from(self._buf, self._keys_at + i * _KEY.size)
+        return self._string(offset, length), place_id
+
+    def __getitem__(self, i: int) -> bytes:
+        # lets bisect search the key table directly
+        return self._entry(i)[0]
+
+    def _place(self, place_id: int) -> Place:
+        latitude, longitude, population, offset, length, country = _PLACE.unpack_from(
+            self._buf, self._places_at + place_id * _PLACE.size
+        )
+        return Place(place_id, self._string(offset, length).decode(), country.decode(),
+                     latitude, longitude, population)
+
+    def resolve(self, name: str) -> Optional[Place]:
+        """The place a name or alias refers to; the first listed wins when several share it."""
+        key = normalize(name).encode()
+        i = bisect.bisect_left(self, key)
+        if i < self.key_count:
+            found, place_id = self._entry(i)
+            if found == key:
+                return self.place(place_id)
+        return None
+
+    def search(self, prefix: str, limit: int = 5) -> list[Place]:
+        """
+        Places whose name or an alias starts with ``prefix``: exact matches first,
+        then matches on the city's own name rather than an alias, then the biggest.
+        """
+        key = normalize(prefix).encode()
+        if not key:
+            return []
+        # place id -> whether one of its names matched exactly
+        found: dict[int, bool] = {}
+        i = bisect.bisect_left(self, key)
+        while i < self.key_count:
+            entry, place_id = self._entry(i)
+            if not entry.startswith(key):
+                break
+            found[place_id] = found.get(place_id, False) or entry == key
+            i += 1
+        places = [self.place(place_id) for place_id in found]
+        places.sort(key=lambda place: (
+            not found[place.id],
+            not normalize(place.name).encode().startswith(key),
+            -place.population,
+            place.id,
+        ))
+        return places[:limit]
+
+
+_gazetteer: Optional[Gazetteer] = None
+
+
+def load(cities_path: Path = CITIES_PATH, index_path: Path = INDEX_PATH) -> Gazetteer:
+    """Maps the index, building it first if it is missing or older than the CSV."""
+    global _gazetteer
+    if not index_path.exists() or index_path.stat().st_mtime < cities_path.stat().st_mtime:
+        build(cities_path, index_path)
+    _gazetteer = Gazetteer(index_path)
+    return _gazetteer
+
+
+def _get() -> Gazetteer:
+    return _gazetteer or load()
+
+
+def resolve(name: str) -> Optional[Place]:
+    """The bundled place a typed city name or alias refers to, or None."""
+    return _get().resolve(name)
+
+
+def search(prefix: str, limit: int = 5) -> list[Place]:
+    """Autocomplete: places whose name or alias starts with ``prefix``."""
+    return _get().search(prefix, limit)
+
+
+if __name__ == "__main__":
+    build()
+    print(f"Wrote {INDEX_PATH.name}: {len(load())} names")
@@ -0,0 +1,47 @@
+"""
+Snaps locations to H3 cells so nearby users share one cached reading.
+
+A shared location is replaced by the centre of its cell at GRID_RESOLUTION;
+random points use the much coarser RANDOM_GRID_RESOLUTION, where cells
+actually repeat. Average cell edge: res 5 ~8.5 km, res 6 ~3.2 km,
+res 7 ~1.2 km, res 8 ~0.46 km.
+"""
+import os
+from typing import NamedTuple
+
+from h3.api import basic_int as h3
+
+import metrics
+from weather_api_service import Coordinates, WeatherReport, get_cell_weather_report
+
+GRID_RESOLUTION = int(os.getenv("GRID_RESOLUTION", "7"))
+RANDOM_GRID_RESOLUTION = int(os.getenv("RANDOM_GRID_RESOLUTION", "3"))
+
+# Decimals kept of a cell centre; plenty for a weather lookup and a map pin
+CENTRE_PRECISION = 4
+
+metrics.Collected(
+    "grid_resolution", "H3 resolution locations are snapped to", "gauge", ("kind",),
+    lambda: [(("location",), GRID_RESOLUTION), (("random",), RANDOM_GRID_RESOLUTION)],
+)
+
+
+class Cell(NamedTuple):
+    index: int
+    centre: Coordinates
+
+
+def snap(coordinates: Coordinates, resolution: int = GRID_RESOLUTION) -> Cell:
+    """Returns the H3 cell containing the point, with its centre."""
+    index = h3.latlng_to_cell(coordinates.latitude, coordinates.longitude, resolution)
+    latitude, longitude = h3.cell_to_latlng(index)
+    return Cell(
+        index=index,
+        centre=Coordinates(round(latitude, CENTRE_PRECISION), round(longitude, CENTRE_PRECISION)),
+    )
+
+
+async def get_snapped_report(coordinates: Coordinates, resolution: int = GRID_RESOLUTION) -> WeatherReport:
+    """Weather and air quality for the cell around a point; report.coordinates is the centre."""
+    cell = snap(coordinates, resolution)
+    return await get_cell_weather_report(cell.index, cell.centre)
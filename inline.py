@@ -0,0 +1,86 @@
+"""
+Inline-mode pipeline: debounces keystrokes per user, autocompletes the query
+against the gazetteer and attaches cached weather to each suggestion.
+"""
+import asyncio
+import hashlib
+
+import metrics
+from cache import TTLCache, city_key
+from gazetteer import Place, search
+from exceptions import ApiServiceError, WrongInput
+from weather_api_service import Weather, get_city_weather, get_current_weather
+
+# Suggestions per answer
+INLINE_RESULTS = 5
+# Shorter queries match too many cities to be worth fetching weather for
+INLINE_MIN_QUERY = 3
+# A query is answered only if no newer one from the same user arrives within this (seconds)
+INLINE_DEBOUNCE = 0.3
+# Telegram caches an answer per query text this long; readings are cached for 10 minutes anyway
+INLINE_CACHE_TIME = 300
+
+SUPERSEDED = metrics.Counter(
+    "inline_superseded_total", "Inline queries dropped because the user kept typing", ("stage",),
+)
+
+
+class Debouncer:
+    """Remembers each user's latest inline query, so older ones can be dropped."""
+
+    def __init__(self, delay: float = INLINE_DEBOUNCE):
+        self.delay = delay
+        # Idle users drop out after a minute
+        self._latest = TTLCache(ttl=60, maxsize=100_000, name="inline_latest")
+
+    def is_latest(self, user_id: int, query_id: str) -> bool:
+        return self._latest.get(user_id) == query_id
+
+    async def settle(self, user_id: int, query_id: str) -> bool:
+        """Waits out the debounce delay; False if a newer query came in meanwhile."""
+        self._latest.set(user_id, query_id)
+        await asyncio.sleep(self.delay)
+        if self.is_latest(user_id, query_id):
+            return True
+        SUPERSEDED.inc(stage="debounce")
+        return False
+
+
+def _result_id(prefix: str, value: str) -> str:
+    # Telegram caps ids at 64 bytes; the same suggestion always gets the same id
+    return f"{prefix}:{hashlib.sha1(value.encode()).hexdigest()[:16]}"
+
+
+async def _place_weather(place: Place) -> Weather:
+    weather = await get_current_weather(place.latitude, place.longitude)
+    # A by-coordinates reading is named after the nearest station; show the city instead
+    return weather._replace(city=place.name, country=place.country)
+
+
+async def _lookup_weather(query: str) -> Weather:
+    return (await get_city_weather(query)).weather
+
+
+async def suggestions(query: str, limit: int = INLINE_RESULTS) -> list[tuple[str, Weather]]:
+    """
+    Returns (result id, weather) for the cities matching a query prefix.
+    Falls back to asking OpenWeather for the query as a city name when
+    the gazetteer has no match. Queries under INLINE_MIN_QUERY characters get none.
+    """
+    if len(city_key(query)) < INLINE_MIN_QUERY:
+        return []
+    places = search(query, limit)
+    if places:
+        ids = [f"city:{place.id}" for place in places]
+        readings = await asyncio.gather(*map(_place_weather, places), return_exceptions=True)
+    else:
+        ids = [_result_id("q", city_key(query))]
+        readings = await asyncio.gather(_lookup_weather(query), return_exceptions=True)
+    results = []
+    for result_id, weather in zip(ids, readings):
+        if isinstance(weather, (ApiServiceError, WrongInput)):
+            continue
+        if isinstance(weather, BaseException):
+            raise weather
+        results.append((result_id, weather))
+    return results
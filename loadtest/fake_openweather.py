@@ -0,0 +1,60 @@
+"""
+Local stand-in for the OpenWeather API serving the recorded payloads in tests/fixtures.
+
+    python -m loadtest.fake_openweather --port 8081 --latency 0.08 --error-rate 0.01
+
+then run the bot with OPENWEATHER_BASE=http://127.0.0.1:8081/data/2.5
+"""
+import argparse
+import asyncio
+import random
+from collections import Counter
+from pathlib import Path
+
+from aiohttp import web
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures"
+
+# A q= value containing this is answered with OpenWeather's 404 body
+UNKNOWN_CITY = "nowhere"
+
+
+def make_app(latency: float = 0.05, jitter: float = 0.5, error_rate: float = 0.0,
+             seed: int = 1) -> web.Application:
+    """
+    Builds the app. Each response waits ``latency`` seconds (± ``jitter`` of it),
+    and ``error_rate`` of requests get a 500.
+    """
+    rng = random.Random(seed)
+    payloads = {name: (FIXTURES / f"{name}.json").read_bytes()
+                for name in ("weather", "forecast", "air_pollution", "city_not_found")}
+    requests = Counter()
+
+    def endpoint(name: str):
+        async def handle(request: web.Request) -> web.Response:
+            requests[name] += 1
+            await asyncio.sleep(latency * rng.uniform(1 - jitter, 1 + jitter))
+            if rng.random() < error_rate:
+                requests[f"{name}_error"] += 1
+                return web.json_response({"cod": 500, "message": "Internal error"}, status=500)
+            if UNKNOWN_CITY in request.query.get("q", "").lower():
+                return web.Response(body=payloads["city_not_found"], status=404,
+                                    content_type="application/json")
+            return web.Response(body=payloads[name], content_type="application/json")
+        return handle
+
+    app = web.Application()
+    app["requests"] = requests
+    app.router.add_get("/data/2.5/weather", endpoint("weather"))
+    app.router.add_get("/data/2.5/forecast", endpoint("forecast"))
+    app.router.add_get("/data/2.5/air_pollution", endpoint("air_pollution"))
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenWeather API")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(make_app(args.latency, error_rate=args.error_rate), host="127.0.0.1", port=args.port)
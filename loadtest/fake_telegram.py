@@ -0,0 +1,57 @@
+"""
+Minimal fake Telegram Bot API: accepts every method and answers with a plausible result.
+
+    python -m loadtest.fake_telegram --port 8082
+
+then run the bot with TELEGRAM_API_SERVER=http://127.0.0.1:8082
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "WeWeather", "username": "weweather_test_bot"}
+
+# Methods that return a Message; everything else returns True
+_MESSAGE_METHODS = {"sendmessage", "sendlocation", "editmessagetext"}
+
+
+def make_app(latency: float = 0.02) -> web.Application:
+    """Builds the app; every call waits ``latency`` seconds like a real round trip."""
+    calls = Counter()
+    message_ids = itertools.count(1)
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        calls[method] += 1
+        params = dict(await request.post()) if request.can_read_body else {}
+        await asyncio.sleep(latency)
+        if method == "getme":
+            result = BOT_USER
+        elif method in _MESSAGE_METHODS:
+            result = {
+                "message_id": next(message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app["calls"] = calls
+    app.router.add_post("/bot{token}/{method}", handle)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    web.run_app(make_app(args.latency), host="127.0.0.1", port=args.port)
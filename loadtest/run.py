@@ -0,0 +1,174 @@
+"""
+End-to-end load test: replays a mixed update stream into the real dispatcher,
+with OpenWeather and the Telegram Bot API replaced by local fakes.
+
+    python -m loadtest.run --updates 2000 --concurrency 100 --ow-latency 0.08
+
+Reports throughput and p50/p95/p99 latency per update kind, failure rates per
+handler (from the bot's own handler metrics), plus upstream call counts.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from aiohttp import web
+
+from loadtest import fake_openweather, fake_telegram
+
+CITIES = ["Stockholm", "Oslo", "Berlin", "Paris", "London", "Tokyo", "New York", "Madrid", "Rome", "Kyiv"]
+# Not in the gazetteer: resolved by name through OpenWeather. The fake 404s on "nowhere",
+# which weather_by_city answers and then re-raises, so it shows up in its error rate
+UNLISTED_CITIES = ["Hallstatt", "Visby", "Lund", fake_openweather.UNKNOWN_CITY]
+
+# Relative frequency of each update kind in the replayed stream
+MIX = {
+    "city_text": 40,
+    "inline_query": 25,
+    "location": 10,
+    "fav_callback": 10,
+    "forecast": 10,
+    "random_callback": 5,
+}
+
+
+async def _serve(app: web.Application) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": "Load", "language_code": "en"}
+
+
+def _message(ids: itertools.count, user_id: int, **content) -> dict:
+    return {
+        "message_id": next(ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": _user(user_id),
+        **content,
+    }
+
+
+def make_update(kind: str, update_id: int, rng: random.Random, ids: itertools.count) -> dict:
+    """Builds one raw Telegram update of the given kind."""
+    user_id = rng.randrange(1, 5000)
+    city = rng.choice(CITIES)
+    if kind in ("city_text", "forecast") and rng.random() < 0.2:
+        city = rng.choice(UNLISTED_CITIES)
+    if kind == "city_text":
+        return {"update_id": update_id, "message": _message(ids, user_id, text=city)}
+    if kind == "forecast":
+        return {"update_id": update_id, "message": _message(ids, user_id, text=f"/forecast {city}")}
+    if kind == "location":
+        location = {"latitude": rng.uniform(-60, 70), "longitude": rng.uniform(-180, 180)}
+        return {"update_id": update_id, "message": _message(ids, user_id, location=location)}
+    if kind == "inline_query":
+        # a user typing: a random prefix of the city name
+        query = city[:rng.randrange(1, len(city) + 1)]
+        return {"update_id": update_id, "inline_query": {
+            "id": str(update_id), "from": _user(user_id), "query": query, "offset": "",
+        }}
+    data = f"fav:{city}" if kind == "fav_callback" else "random_weather"
+    return {"update_id": update_id, "callback_query": {
+        "id": str(update_id),
+        "from": _user(user_id),
+        "chat_instance": str(user_id),
+        "data": data,
+        "message": _message(ids, user_id, text="\u2764\ufe0f Your favourite cities:"),
+    }}
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def report(latencies: dict[str, list[float]], elapsed: float) -> None:
+    total = sum(map(len, latencies.values()))
+    print(f"\n{total} updates in {elapsed:.2f}s — {total / elapsed:.1f} updates/s\n")
+    print(f"{'kind':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for kind in sorted(latencies):
+        values = sorted(latencies[kind])
+        print(f"{kind:<18}{len(values):>7}"
+              f"{_percentile(values, 50) * 1000:>10.1f}"
+              f"{_percentile(values, 95) * 1000:>10.1f}"
+              f"{_percentile(values, 99) * 1000:>10.1f}")
+
+
+def report_errors(calls: dict[tuple[str, ...], int], errors: dict[tuple[str, ...], float]) -> None:
+    """Per-handler failures; handlers log and swallow them, so the metrics are the only record."""
+    print(f"\n{'handler':<26}{'calls':>7}{'errors':>8}{'error %':>9}")
+    for labels in sorted(calls):
+        failed = int(errors.get(labels, 0))
+        print(f"{labels[0]:<26}{calls[labels]:>7}{failed:>8}{failed / calls[labels] * 100:>9.1f}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    ow_runner, ow_url = await _serve(fake_openweather.make_app(args.ow_latency, error_rate=args.error_rate))
+    tg_runner, tg_url = await _serve(fake_telegram.make_app(args.tg_latency))
+
+    # The bot reads its configuration at import time
+    os.environ.update({
+        "TELEGRAM_API_TOKEN": "123456:LOADTEST",
+        "OPEN_WEATHER_API_TOKEN": "loadtest",
+        "OPENWEATHER_BASE": f"{ow_url}/data/2.5",
+        "TELEGRAM_API_SERVER": tg_url,
+        "DATABASE_PATH": str(Path(tempfile.mkdtemp()) / "loadtest.db"),
+    })
+    os.environ.pop("WEBHOOK_URL", None)
+    import metrics
+    import server
+    from aiogram.types import Update
+
+    rng = random.Random(args.seed)
+    ids = itertools.count(1)
+    kinds = rng.choices(list(MIX), weights=list(MIX.values()), k=args.updates)
+    updates = [(kind, Update.model_validate(make_update(kind, i, rng, ids), context={"bot": server.bot}))
+               for i, kind in enumerate(kinds, start=1)]
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def feed(kind: str, update: Update) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await server.dp.feed_update(server.bot, update)
+            latencies[kind].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(feed(kind, update) for kind, update in updates))
+    elapsed = time.perf_counter() - started
+
+    report(latencies, elapsed)
+    report_errors(metrics.HANDLER_SECONDS.counts(), metrics.HANDLER_ERRORS.values())
+    print(f"\nOpenWeather requests: {dict(ow_runner.app['requests'])}")
+    print(f"Telegram calls:       {dict(tg_runner.app['calls'])}")
+
+    await server.close_session()
+    await server.bot.session.close()
+    await ow_runner.cleanup()
+    await tg_runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a realistic update stream against local fakes")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--ow-latency", type=float, default=0.08, help="fake OpenWeather latency, seconds")
+    parser.add_argument("--tg-latency", type=float, default=0.02, help="fake Telegram latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of OpenWeather 500s")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
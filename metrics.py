@@ -0,0 +1,199 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = tuple[str, ...]
+
+_registry: list = []
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> dict[LabelValues, float]:
+        """Current value per label set."""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, Prometheus style."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values: dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def counts(self) -> dict[LabelValues, int]:
+        """Observations so far per label set."""
+        with self._lock:
+            return {key: sum(counts) for key, (counts, _) in self._values.items()}
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Collected:
+    """Values read from elsewhere at scrape time, e.g. a cache's hit counters."""
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: tuple[str, ...],
+                 collect: Callable[[], Iterable[tuple[LabelValues, float]]]):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self.collect = collect
+        _registry.append(self)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+_caches: list = []
+
+
+def track_cache(cache) -> None:
+    """Exports a TTLCache's hit/miss/eviction counters and size, labelled by its name."""
+    _caches.append(cache)
+
+
+Collected(
+    "cache_requests_total", "Cache lookups by result", "counter", ("cache", "result"),
+    lambda: [item for cache in _caches
+             for item in (((cache.name, "hit"), cache.hits), ((cache.name, "miss"), cache.misses),
+                          ((cache.name, "stale"), cache.stale_hits))],
+)
+Collected(
+    "cache_evictions_total", "Entries evicted to stay under maxsize", "counter", ("cache",),
+    lambda: [((cache.name,), cache.evictions) for cache in _caches],
+)
+Collected(
+    "cache_entries", "Entries currently held", "gauge", ("cache",),
+    lambda: [((cache.name,), len(cache)) for cache in _caches],
+)
+
+HANDLER_SECONDS = Histogram(
+    "bot_handler_seconds", "Time spent in each aiogram handler", ("handler", "event"),
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total", "Handlers that raised", ("handler", "event"),
+)
+
+
+class HandlerTimingMiddleware:
+    """
+    aiogram inner middleware: times every handler it wraps, labelled by handler name.
+    Register it on each observer, e.g. ``router.message.middleware(HandlerTimingMiddleware())``.
+    """
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        labels = {"handler": name, "event": type(event).__name__}
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(**labels)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, **labels)
+
+
+async def start_server(host: str, port: int):
+    """Serve GET /metrics on host:port. Returns the aiohttp runner, to be cleaned up on shutdown."""
+    # imported here so storage and friends can record metrics without aiohttp installed
+    from aiohttp import web
+
+    async def _metrics_view(request: web.Request) -> web.Response:
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_view)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
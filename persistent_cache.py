@@ -0,0 +1,169 @@
+"""
+Second-tier response cache in its own SQLite file, so a restarted bot starts warm.
+
+Entries carry their wall-clock expiry; reads skip expired rows and a background
+task deletes them, trims the table to ``maxsize`` rows (soonest to expire first)
+and returns freed pages to the OS. Every query runs on one dedicated thread,
+separate from the favourites database thread.
+"""
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Hashable, Optional
+
+from loguru import logger
+
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    import json
+
+    def json_dumps(value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    json_loads = json.loads
+
+# Rows kept after compaction, across every cache sharing the file
+MAX_ENTRIES = 100_000
+# Seconds between compaction runs
+COMPACT_INTERVAL = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    cache      TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (cache, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses (expires_at);
+"""
+
+
+def _key(key: Hashable) -> str:
+    # Keys are tuples of str/float/int, whose repr is stable across runs
+    return repr(key)
+
+
+class PersistentCache:
+    """SQLite-backed cache of JSON responses with per-entry TTL."""
+
+    def __init__(self, path: Path, maxsize: int = MAX_ENTRIES):
+        self.path = path
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-db")
+        self._compactor: Optional[asyncio.Task] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Only ever touched from the executor thread
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            # must precede table creation to take effect on a new file
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _get(self, cache: str, key: str, now: float) -> Optional[tuple[bytes, float]]:
+        return self._connection().execute(
+            "SELECT value, expires_at FROM responses WHERE cache = ? AND key = ? AND expires_at > ?",
+            (cache, key, now),
+        ).fetchone()
+
+    def _put(self, cache: str, key: str, value: bytes, expires_at: float) -> None:
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (cache, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (cache, key, value, expires_at),
+                )
+            self.writes += 1
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent cache write failed: {e}")
+
+    def _compact(self, now: float) -> int:
+        with self._connection() as conn:
+            removed = conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+            removed += conn.execute(
+                """
+                DELETE FROM responses WHERE (cache, key) IN (
+                    SELECT cache, key FROM responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.maxsize,),
+            ).rowcount
+        self._connection().execute("PRAGMA incremental_vacuum")
+        self.evictions += removed
+        return removed
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def get(self, cache: str, key: Hashable) -> Optional[tuple[Any, float]]:
+        """Returns (value, seconds left) for a fresh entry, or None."""
+        now = time.time()
+        try:
+            row = await self._run(self._get, cache, _key(key), now)
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent cache read failed: {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        value, expires_at = row
+        return json_loads(value), expires_at - now
+
+    def put(self, cache: str, key: Hashable, value: Any, ttl: float) -> None:
+        """Queues a write on the cache thread and returns at once."""
+        self._executor.submit(self._put, cache, _key(key), json_dumps(value), time.time() + ttl)
+
+    async def compact(self) -> int:
+        """Deletes expired rows and trims to maxsize. Returns the number removed."""
+        return await self._run(self._compact, time.time())
+
+    async def _compact_forever(self) -> None:
+        while True:
+            try:
+                removed = await self.compact()
+                if removed:
+                    logger.info(f"Persistent cache compacted, {removed} entries removed")
+            except sqlite3.Error as e:
+                logger.warning(f"Persistent cache compaction failed: {e}")
+            await asyncio.sleep(COMPACT_INTERVAL)
+
+    def start(self) -> None:
+        """Starts background compaction; the first run happens right away."""
+        if self._compactor is None:
+            self._compactor = asyncio.create_task(self._compact_forever())
+
+    async def stop(self) -> None:
+        """Stops compaction, waits for queued writes and closes the file."""
+        if self._compactor is not None:
+            self._compactor.cancel()
+            await asyncio.gather(self._compactor, return_exceptions=True)
+            self._compactor = None
+        await self._run(self._close)
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
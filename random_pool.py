@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+# Prefetched items kept ready, and how many producers refill them concurrently
+POOL_SIZE = 8
+POOL_PRODUCERS = 2
+# Items older than this are dropped instead of served (seconds); matches the weather TTL
+MAX_AGE = 600
+# Pause after a failed produce before trying again (seconds)
+RETRY_DELAY = 5
+
+
+class RandomPool(Generic[T]):
+    """
+    Keeps up to ``size`` items from ``produce`` ready in a bounded queue, refilled
+    by background tasks, so take() usually returns at once. Producers only run when
+    a slot is free: a pool nobody takes from makes no calls. Items older than
+    ``max_age`` are dropped by take(), which frees their slots for fresh ones.
+    """
+
+    def __init__(self, produce: Callable[[], Awaitable[T]], size: int = POOL_SIZE,
+                 producers: int = POOL_PRODUCERS, max_age: float = MAX_AGE):
+        self._produce = produce
+        self.size = size
+        self.producers = producers
+        self.max_age = max_age
+        self._queue: asyncio.Queue[tuple[float, T]] = asyncio.Queue(maxsize=max(size, 1))
+        self._tasks: list[asyncio.Task] = []
+        # set by take(), so producers blocked on a full pool wake up
+        self._taken = asyncio.Event()
+        # slots a producer is currently filling
+        self._pending = 0
+        self.served = 0
+        self.produced_inline = 0
+        self.expired = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Starts the producers. A pool of size 0 stays empty and take() produces inline."""
+        if self.size > 0 and not self._tasks:
+            self._tasks = [asyncio.create_task(self._fill()) for _ in range(self.producers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def take(self) -> T:
+        """Returns a fresh prefetched item, or produces one now if the pool is empty."""
+        while not self._queue.empty():
+            produced_at, item = self._queue.get_nowait()
+            self._taken.set()
+            if time.monotonic() - produced_at <= self.max_age:
+                self.served += 1
+                return item
+            self.expired += 1
+        self.produced_inline += 1
+        return await self._produce()
+
+    async def _room(self) -> None:
+        """Waits for a slot no other producer is filling, and reserves it."""
+        while self._queue.qsize() + self._pending >= self.size:
+            self._taken.clear()
+            await self._taken.wait()
+        self._pending += 1
+
+    async def _fill(self) -> None:
+        while True:
+            await self._room()
+            try:
+                item = await self._produce()
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Random pool producer failed: {e}")
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            finally:
+                self._pending -= 1
+            self._queue.put_nowait((time.monotonic(), item))
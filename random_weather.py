@@ -1,5 +1,5 @@
+import math
 import random
-from decimal import Decimal
 from typing import NamedTuple
 
 
@@ -8,19 +8,33 @@ class Coordinates(NamedTuple):
     longitude: float
 
 
-ACCURACY = Decimal('.0001')
+# Decimals kept of a random point (~11 m)
+ACCURACY = 4
 
 
 def generate_random_coords() -> Coordinates:
     """
-    Generates a random set of longitude and latitude coordinates
+    Generates a random point, uniformly distributed over the globe's surface
     """
-    # Set the range of longitude and latitude values
-    min_longitude, max_longitude = -180, 180
-    min_latitude, max_latitude = -90, 90
+    # asin of a uniform value keeps the poles from being oversampled
+    latitude = math.degrees(math.asin(random.uniform(-1, 1)))
+    longitude = random.uniform(-180, 180)
+    return Coordinates(latitude=round(latitude, ACCURACY), longitude=round(longitude, ACCURACY))
 
-    # Generate random longitude and latitude values within the given range
-    longitude = Decimal(random.uniform(min_longitude, max_longitude)).quantize(ACCURACY)
-    latitude = Decimal(random.uniform(min_latitude, max_latitude)).quantize(ACCURACY)
 
-    return Coordinates(latitude=float(latitude), longitude=float(longitude))
+def generate_land_coords() -> Coordinates:
+    """
+    Generates a random point on land: the centre of a random land cell from the
+    time zone index (see tz_index.py). Falls back to generate_random_coords
+    when the index has not been built.
+    """
+    # imported here so generate_random_coords works without numpy and h3;
+    # the bot has loaded tz_index already, through timezoneutils
+    import tz_index
+    from h3.api import basic_int as h3
+
+    cells = tz_index.land_cells()
+    if cells is None or len(cells) == 0:
+        return generate_random_coords()
+    latitude, longitude = h3.cell_to_latlng(int(cells[random.randrange(len(cells))]))
+    return Coordinates(latitude=round(latitude, ACCURACY), longitude=round(longitude, ACCURACY))
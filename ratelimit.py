@@ -0,0 +1,100 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+from cache import TTLCache
+
+T = TypeVar("T")
+
+# Telegram allows ~30 messages/s overall and ~1 message/s per chat
+GLOBAL_RATE = 25
+CHAT_RATE = 1
+CHAT_BURST = 2
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, holding at most ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and takes it. Waiters are served in order."""
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Empties the bucket and stops refilling for ``seconds``."""
+        self._tokens = 0
+        self._updated = time.monotonic() + seconds
+
+
+class SendLimiter:
+    """
+    Paces outgoing Telegram calls through a global and a per-chat bucket,
+    retrying on 429 (honouring retry_after) and transient network errors.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, chat_rate: float = CHAT_RATE,
+                 chat_burst: float = CHAT_BURST):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        # Idle chats drop out; a fresh bucket is full, which is what an idle one would be
+        self._chat_buckets = TTLCache(ttl=60, maxsize=100_000, name="chat_buckets")
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets.set(chat_id, bucket)
+        return bucket
+
+    async def send(self, chat_id: int, call: Callable[[], Awaitable[T]]) -> T:
+        """Runs ``call`` once both buckets allow it, retrying up to MAX_RETRIES times."""
+        bucket = self._chat_bucket(chat_id)
+        for attempt in range(MAX_RETRIES + 1):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                result = await call()
+            except TelegramRetryAfter as e:
+                if attempt == MAX_RETRIES:
+                    self.failed += 1
+                    raise
+                self.retried += 1
+                # a 429 usually means the bot as a whole is over the limit
+                self.global_bucket.pause(e.retry_after)
+                await asyncio.sleep(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError):
+                if attempt == MAX_RETRIES:
+                    self.failed += 1
+                    raise
+                self.retried += 1
+                await asyncio.sleep(BACKOFF_BASE * 2 ** attempt)
+            else:
+                self.sent += 1
+                return result
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "retried": self.retried, "failed": self.failed}
@@ -1,43 +1,160 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
 import pytz
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from loguru import logger
+
+import subscriptions
+from coordination import LEASE_SECONDS, Leadership, LocalLeadership
 
 scheduler = AsyncIOScheduler()
 
+# Cities fetched and delivered at the same time within one minute slot
+MAX_CONCURRENT_CITIES = 20
+# A late or skipped tick catches up on at most this many missed minutes
+MAX_CATCH_UP_MINUTES = 60
+# A worker that just became leader (or just started) looks back this far;
+# per-day delivery claims stop anything already sent from going out twice
+TAKEOVER_CATCH_UP_MINUTES = 5
+# A slot can take minutes to send; the lease is renewed this often (seconds) meanwhile
+RENEW_INTERVAL = LEASE_SECONDS / 3
+
+DeliverCity = Callable[[str, list[int]], Awaitable[None]]
+
+_last_slot: Optional[datetime] = None
+_leadership: Leadership = LocalLeadership()
+
+
+def _zones_by_local_time(slot: datetime, timezones: list[str]) -> dict[tuple[str, str], list[str]]:
+    """Groups time zones by their local date and HH:MM at a UTC minute."""
+    groups = defaultdict(list)
+    for tz_name in timezones:
+        try:
+            tz = pytz.timezone(tz_name)
+        except pytz.UnknownTimeZoneError:
+            tz = pytz.utc
+        local = slot.astimezone(tz)
+        groups[(local.strftime("%Y-%m-%d"), local.strftime("%H:%M"))].append(tz_name)
+    return groups
+
+
+async def deliver_slot(slot: datetime, deliver_city: DeliverCity) -> None:
+    """
+    Delivers every subscription due at a UTC minute, once per city.
+    Each subscription is claimed for its local date before sending, so it goes out
+    at most once a day even across workers, catch-ups or a repeated DST hour.
+    """
+    users_by_city = defaultdict(list)
+    timezones = await subscriptions.get_timezones()
+    for (local_date, send_time), zones in _zones_by_local_time(slot, timezones).items():
+        due = await subscriptions.get_due_subscriptions(send_time, zones)
+        if not due:
+            continue
+        claimed = set(await subscriptions.claim_deliveries([sub["user_id"] for sub in due], local_date))
+        for sub in due:
+            if sub["user_id"] in claimed:
+                users_by_city[sub["city"]].append(sub["user_id"])
+    if not users_by_city:
+        return
+
+    logger.info(
+        f"Delivering {sum(map(len, users_by_city.values()))} subscriptions "
+        f"for {len(users_by_city)} cities at {slot:%H:%M} UTC"
+    )
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CITIES)
+
+    async def deliver(city: str, user_ids: list[int]) -> None:
+        async with semaphore:
+            try:
+                await deliver_city(city, user_ids)
+            except Exception as e:
+                logger.error(f"Subscription delivery for '{city}' failed: {e}")
 
-def _job_id(user_id: int) -> str:
-    return f"sub_{user_id}"
+    await asyncio.gather(*(deliver(city, ids) for city, ids in users_by_city.items()))
 
 
-def add_or_replace_job(send_fn, sub: dict) -> None:
-    """Schedule or reschedule a daily weather job for one subscription."""
-    hour, minute = sub["send_time"].split(":")
+async def _keep_leadership(delivery: asyncio.Task) -> None:
+    """
+    Renews the lease while a slot is delivered. If renewal fails another worker
+    may already be sending, and two send limiters would exceed Telegram's global
+    rate, so the delivery is cancelled.
+    """
+    while True:
+        await asyncio.sleep(RENEW_INTERVAL)
+        try:
+            held = await _leadership.acquire()
+        except Exception as e:
+            logger.error(f"Scheduler lease renewal failed: {e}")
+            held = False
+        if not held:
+            logger.warning("Lost scheduler leadership mid-delivery, stopping sends")
+            delivery.cancel()
+            return
+
+
+async def _deliver_as_leader(slot: datetime, deliver_city: DeliverCity) -> bool:
+    """Delivers a slot while holding the lease. False if leadership was lost partway."""
+    delivery = asyncio.create_task(deliver_slot(slot, deliver_city))
+    keeper = asyncio.create_task(_keep_leadership(delivery))
     try:
-        tz = pytz.timezone(sub["tz"])
-    except pytz.UnknownTimeZoneError:
-        tz = pytz.utc
+        await delivery
+        return True
+    except asyncio.CancelledError:
+        if keeper.done() and not keeper.cancelled():
+            return False
+        raise
+    finally:
+        keeper.cancel()
+
+
+async def _tick(deliver_city: DeliverCity) -> None:
+    """
+    Runs every minute on every worker; only the leader delivers.
+    Also covers minutes missed while the bot was busy, asleep or not the leader.
+    """
+    global _last_slot
+    if not await _leadership.acquire():
+        _last_slot = None
+        return
+    now = datetime.now(pytz.utc).replace(second=0, microsecond=0)
+    if _last_slot is None:
+        slot = now - timedelta(minutes=TAKEOVER_CATCH_UP_MINUTES)
+    else:
+        slot = max(_last_slot + timedelta(minutes=1), now - timedelta(minutes=MAX_CATCH_UP_MINUTES))
+    while slot <= now:
+        if not await _deliver_as_leader(slot, deliver_city):
+            _last_slot = None
+            return
+        _last_slot = slot
+        slot += timedelta(minutes=1)
+
+
+def start(deliver_city: DeliverCity, leadership: Optional[Leadership] = None) -> None:
+    """Start the delivery engine: one job that fires every minute for all subscribers."""
+    global _leadership
+    if leadership is not None:
+        _leadership = leadership
     scheduler.add_job(
-        send_fn,
-        trigger=CronTrigger(hour=int(hour), minute=int(minute), timezone=tz),
-        id=_job_id(sub["user_id"]),
-        args=[sub["user_id"], sub["city"]],
+        _tick,
+        trigger=CronTrigger(minute="*", timezone=pytz.utc),
+        id="deliver_subscriptions",
+        args=[deliver_city],
         replace_existing=True,
-        # If the laptop is asleep or network drops, don't drop the job. 
+        max_instances=1,
+        coalesce=True,
+        # If the laptop is asleep or network drops, don't drop the job.
         # Run it as soon as the bot wakes up.
         misfire_grace_time=None,
     )
+    scheduler.start()
 
 
-def remove_job(user_id: int) -> None:
-    """Remove a scheduled job if it exists."""
-    job_id = _job_id(user_id)
-    if scheduler.get_job(job_id):
-        scheduler.remove_job(job_id)
-
-
-def start(send_fn) -> None:
-    """Restore all saved subscriptions and start the scheduler."""
-    from subscriptions import get_all_subscriptions
-    for sub in get_all_subscriptions():
-        add_or_replace_job(send_fn, sub)
-    scheduler.start()
+async def stop() -> None:
+    """Stop the delivery engine and hand leadership over to another worker."""
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    await _leadership.release()
@@ -1,38 +1,47 @@
 import asyncio
 import os
-import time
-import uuid
+from typing import Optional
 
 # Load .env FIRST — before any custom module is imported
 from dotenv import load_dotenv
 load_dotenv()
 
 from aiogram import Bot, Dispatcher, F, Router, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ContentType, ParseMode
 from aiogram.filters import Command
 from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 from loguru import logger
-from timezonefinder import TimezoneFinder
 
 import favourites as fav
+import gazetteer
+import metrics
 import scheduler as sched
+import storage
 import subscriptions
+from coordination import leadership_from_env
 from exceptions import WrongInput
-from random_weather import generate_random_coords
-from timezoneutils import sun_condition, timezone
+from forecast import get_city_forecast, get_forecast
+from gazetteer import Place
+from grid import RANDOM_GRID_RESOLUTION, get_snapped_report
+from inline import INLINE_CACHE_TIME, INLINE_MIN_QUERY, SUPERSEDED, Debouncer, suggestions
+from ratelimit import SendLimiter
+from random_pool import RandomPool
+from random_weather import generate_land_coords, generate_random_coords
+from timezoneutils import sun_condition_async, timezone_async, timezone_name_async
 from weather_api_service import (
-    ERROR,
     Coordinates,
-    get_air_quality_type,
-    get_coordinates_by_city,
-    get_forecast_response,
-    get_openweather_air_response,
-    get_openweather_city_response,
-    get_openweather_response,
-    get_weather,
-    parse_forecast,
+    WeatherReport,
+    close_session,
+    disk_cache,
+    get_city_weather,
+    get_city_weather_report,
+    get_weather_report,
 )
-from weather_repr import feels_like_emoji, forecast_repr, weather_repr, weather_repr_city
+from weather_repr import forecast_repr, inline_repr, report_repr
 
 logger.add(
     "log_errors.log",
@@ -45,16 +54,80 @@ API_TOKEN = os.getenv("TELEGRAM_API_TOKEN")
 if not API_TOKEN:
     raise RuntimeError("TELEGRAM_API_TOKEN is not set — check your .env file")
 
-# Initialize SQLite tables on startup
-fav.init_db()
-subscriptions.init_subscriptions_table()
-
-bot = Bot(token=API_TOKEN)
+# Webhook mode is used when WEBHOOK_URL is set; otherwise the bot long-polls
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+if WEBHOOK_URL and not WEBHOOK_SECRET:
+    raise RuntimeError("WEBHOOK_SECRET must be set when WEBHOOK_URL is — check your .env file")
+
+# Prometheus metrics on a local port, off unless METRICS_PORT is set;
+# workers sharing a host each need their own port
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+# Create or upgrade SQLite tables on startup
+storage.migrate()
+
+# A self-hosted Bot API server, or the fake one in loadtest/
+TELEGRAM_API_SERVER = os.getenv("TELEGRAM_API_SERVER")
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_SERVER)) if TELEGRAM_API_SERVER else None
+bot = Bot(token=API_TOKEN, session=session)
 dp = Dispatcher()
 router = Router()
 dp.include_router(router)
 
-_tf = TimezoneFinder()
+# Inner middleware runs once a handler has matched, so it can label by handler name
+_handler_timing = metrics.HandlerTimingMiddleware()
+router.message.middleware(_handler_timing)
+router.callback_query.middleware(_handler_timing)
+router.inline_query.middleware(_handler_timing)
+
+
+@router.errors()
+async def log_handler_error(event: types.ErrorEvent) -> bool:
+    """
+    Logs whatever a handler raised and marks it handled. Errors reach here after
+    the timing middleware, so they are counted in bot_handler_errors_total too.
+    """
+    logger.opt(exception=event.exception).error(f"Update {event.update.update_id} failed")
+    return True
+
+
+send_limiter = SendLimiter()
+inline_debouncer = Debouncer()
+metrics.Collected(
+    "telegram_sends_total", "Rate-limited sends by outcome", "counter", ("result",),
+    lambda: [(("sent",), send_limiter.sent), (("retried",), send_limiter.retried),
+             (("failed",), send_limiter.failed)],
+)
+_metrics_runner: Optional[web.AppRunner] = None
+
+# /random: "land" samples interior land cells from the tz index (uniform if it is not built)
+RANDOM_SAMPLER = os.getenv("RANDOM_SAMPLER", "land")
+RANDOM_POOL_SIZE = int(os.getenv("RANDOM_POOL_SIZE", "8"))
+
+
+async def _random_report() -> WeatherReport:
+    sample = generate_land_coords if RANDOM_SAMPLER == "land" else generate_random_coords
+    report = await get_snapped_report(sample(), RANDOM_GRID_RESOLUTION)
+    # warms the zone cache, so rendering on click needs no polygon lookup
+    await timezone_name_async(report.coordinates)
+    return report
+
+
+random_pool = RandomPool(_random_report, size=RANDOM_POOL_SIZE)
+metrics.Collected(
+    "random_pool_total", "/random reports by source", "counter", ("result",),
+    lambda: [(("served",), random_pool.served), (("inline",), random_pool.produced_inline),
+             (("expired",), random_pool.expired), (("failed",), random_pool.failed)],
+)
+metrics.Collected(
+    "random_pool_size", "Prefetched /random reports ready", "gauge", (),
+    lambda: [((), len(random_pool))],
+)
 
 
 # ---------------------------------------------------------------------------
@@ -72,75 +145,90 @@ def _map_button(lat: float, lon: float) -> types.InlineKeyboardMarkup:
     )
 
 
+async def _report_text(report: WeatherReport) -> str:
+    """Builds the common weather message body for a report."""
+    coordinates = report.coordinates
+    weather = report.weather
+    area, local_time = await timezone_async(coordinates)
+    sun_conditions = await sun_condition_async(
+        sunrise=weather.sunrise,
+        sunset=weather.sunset,
+        coordinates=coordinates,
+    )
+    return report_repr(report, area, local_time, sun_conditions)
+
+
+async def _city_report(city: str) -> WeatherReport:
+    """
+    Current weather and air quality for a typed city. Known cities resolve
+    locally, so both are fetched at once by coordinates; others go through
+    OpenWeather's geocoding. Raises WrongInput for unknown cities.
+    """
+    place = gazetteer.resolve(city)
+    if place is None:
+        return await get_city_weather_report(city)
+    report = await get_weather_report(place.coordinates)
+    # A by-coordinates reading is named after the nearest station; show the city instead
+    return report._replace(weather=report.weather._replace(city=place.name, country=place.country))
+
+
+async def _locate(city: str) -> Optional[Place]:
+    """Canonical name and coordinates for a typed city, or None if nobody knows it."""
+    place = gazetteer.resolve(city)
+    if place is not None:
+        return place
+    try:
+        weather, (latitude, longitude) = await get_city_weather(city)
+    except WrongInput:
+        return None
+    return Place(-1, weather.city or city, weather.country or "", latitude, longitude)
+
+
 async def _send_city_weather(message: types.Message, city: str) -> None:
     """Fetch and send current weather for a city. Shared by city search and favourite buttons."""
-    response = get_openweather_city_response(city)
-    if response["cod"] != ERROR:
-        coordinates = get_coordinates_by_city(response)
-        air_index_response = get_openweather_air_response(coordinates.latitude, coordinates.longitude)
-        air_index_quality = get_air_quality_type(air_index_response)
-        area, local_time = timezone(coordinates)
-        weather = get_weather(response)
-        sun_conditions = sun_condition(
-            sunrise=time.mktime(weather.sunrise.timetuple()),
-            sunset=time.mktime(weather.sunset.timetuple()),
-            coordinates=coordinates,
-        )
-        weather_represent = weather_repr_city(weather)
-        await message.answer(
-            f"Time zone: {area}\n"
-            f"Local time: {local_time}\n"
-            f"Air Index Quality: {air_index_quality.value}\n"
-            f"{'*' * 10}\n"
-            f"{weather_represent}"
-            f"{'*' * 10}\n"
-            f"\U0001f305: {sun_conditions.sunrise.strftime('%H:%M')}\n"
-            f"\U0001f307: {sun_conditions.sunset.strftime('%H:%M')}",
-            reply_markup=_map_button(coordinates.latitude, coordinates.longitude),
-        )
-        await bot.send_location(message.chat.id, latitude=coordinates.latitude, longitude=coordinates.longitude)
-    else:
+    try:
+        report = await _city_report(city)
+    except WrongInput:
         await message.answer("Oops, looks like there is no such city\nCheck the spelling")
-        raise WrongInput(f'City "{city}" is not defined')
+        raise
+    coordinates = report.coordinates
+    await message.answer(
+        await _report_text(report),
+        reply_markup=_map_button(coordinates.latitude, coordinates.longitude),
+    )
+    await bot.send_location(message.chat.id, latitude=coordinates.latitude, longitude=coordinates.longitude)
 
 
-async def _send_subscription_weather(user_id: int, city: str) -> None:
-    """Called by the scheduler — sends daily weather directly to a user by ID."""
+async def _send_subscription_weather(user_id: int, text: str, coordinates: Coordinates) -> None:
+    """Sends a prepared daily report to one subscriber, paced by the send limiter."""
     try:
-        response = get_openweather_city_response(city)
-        if response.get("cod") == ERROR:
-            logger.warning(f"Subscription: city '{city}' not found for user {user_id}")
-            return
-        coordinates = get_coordinates_by_city(response)
-        air_response = get_openweather_air_response(coordinates.latitude, coordinates.longitude)
-        air_quality = get_air_quality_type(air_response)
-        weather = get_weather(response)
-        sun_conds = sun_condition(
-            sunrise=time.mktime(weather.sunrise.timetuple()),
-            sunset=time.mktime(weather.sunset.timetuple()),
-            coordinates=coordinates,
-        )
-        area, local_time = timezone(coordinates)
-        weather_text = weather_repr_city(weather)
-        await bot.send_message(
+        await send_limiter.send(user_id, lambda: bot.send_message(
             user_id,
-            f"\U0001f4cb <b>Cheers! Daily weather for {city}</b>\n\n"
-            f"Time zone: {area}\n"
-            f"Local time: {local_time}\n"
-            f"Air Index Quality: {air_quality.value}\n"
-            f"{'*' * 10}\n"
-            f"{weather_text}"
-            f"{'*' * 10}\n"
-            f"\U0001f305: {sun_conds.sunrise.strftime('%H:%M')}\n"
-            f"\U0001f307: {sun_conds.sunset.strftime('%H:%M')}",
+            text,
             parse_mode=ParseMode.HTML,
             reply_markup=_map_button(coordinates.latitude, coordinates.longitude),
-        )
-        await bot.send_location(user_id, latitude=coordinates.latitude, longitude=coordinates.longitude)
+        ))
+        await send_limiter.send(user_id, lambda: bot.send_location(
+            user_id, latitude=coordinates.latitude, longitude=coordinates.longitude,
+        ))
     except Exception as e:
         logger.error(f"Failed to send subscription weather to user {user_id}: {e}")
 
 
+async def _deliver_subscription_city(city: str, user_ids: list[int]) -> None:
+    """Called by the scheduler — fetches a city once and sends it to all its subscribers."""
+    try:
+        report = await _city_report(city)
+    except WrongInput:
+        logger.warning(f"Subscription: city '{city}' not found for users {user_ids}")
+        return
+    weather_text = await _report_text(report)
+    text = f"\U0001f4cb <b>Cheers! Daily weather for {city}</b>\n\n{weather_text}"
+    await asyncio.gather(*(
+        _send_subscription_weather(user_id, text, report.coordinates) for user_id in user_ids
+    ))
+
+
 # ---------------------------------------------------------------------------
 # General handlers
 # ---------------------------------------------------------------------------
@@ -197,29 +285,11 @@ async def random_weather(message: types.Message):
 
 
 @router.callback_query(F.data == "random_weather")
-@logger.catch
 async def send_random_weather(callback: types.CallbackQuery):
-    coordinates = generate_random_coords()
-    openweather_response = get_openweather_response(coordinates.latitude, coordinates.longitude)
-    air_index_response = get_openweather_air_response(coordinates.latitude, coordinates.longitude)
-    air_index_quality = get_air_quality_type(air_index_response)
-    weather = get_weather(openweather_response)
-    sun_conditions = sun_condition(
-        sunrise=time.mktime(weather.sunrise.timetuple()),
-        sunset=time.mktime(weather.sunset.timetuple()),
-        coordinates=coordinates,
-    )
-    area, local_time = timezone(coordinates)
-    weather_represent = weather_repr(weather)
+    report = await random_pool.take()
+    coordinates = report.coordinates
     await callback.message.answer(
-        f"Time zone: {area}\n"
-        f"Local time: {local_time}\n"
-        f"Air Index Quality: {air_index_quality.value}\n"
-        f"{'*' * 10}\n"
-        f"{weather_represent}"
-        f"{'*' * 10}\n"
-        f"\U0001f305: {sun_conditions.sunrise.strftime('%H:%M')}\n"
-        f"\U0001f307: {sun_conditions.sunset.strftime('%H:%M')}",
+        await _report_text(report),
         parse_mode=ParseMode.HTML,
         reply_markup=_map_button(coordinates.latitude, coordinates.longitude),
     )
@@ -228,32 +298,13 @@ async def send_random_weather(callback: types.CallbackQuery):
 
 
 @router.message(F.content_type == ContentType.LOCATION)
-@logger.catch
 async def weather_by_location(message: types.Message):
     """Returns readable format of the weather."""
-    lat = message.location.latitude
-    lon = message.location.longitude
-    coordinates = Coordinates(*map(lambda x: round(x, 2), [lat, lon]))
-    openweather_response = get_openweather_response(coordinates.latitude, coordinates.longitude)
-    air_index_response = get_openweather_air_response(coordinates.latitude, coordinates.longitude)
-    weather = get_weather(openweather_response)
-    air_index_quality = get_air_quality_type(air_index_response)
-    sun_conditions = sun_condition(
-        sunrise=time.mktime(weather.sunrise.timetuple()),
-        sunset=time.mktime(weather.sunset.timetuple()),
-        coordinates=coordinates,
-    )
-    area, local_time = timezone(coordinates)
-    weather_represent = weather_repr(weather)
+    location = Coordinates(message.location.latitude, message.location.longitude)
+    report = await get_snapped_report(location)
+    coordinates = report.coordinates
     await message.answer(
-        f"Time zone: {area}\n"
-        f"Local time: {local_time}\n"
-        f"Air Index Quality: {air_index_quality.value}\n"
-        f"{'*' * 10}\n"
-        f"{weather_represent}"
-        f"{'*' * 10}\n"
-        f"\U0001f305: {sun_conditions.sunrise.strftime('%H:%M')}\n"
-        f"\U0001f307: {sun_conditions.sunset.strftime('%H:%M')}",
+        await _report_text(report),
         reply_markup=_map_button(coordinates.latitude, coordinates.longitude),
         parse_mode=ParseMode.HTML,
     )
@@ -266,7 +317,6 @@ async def weather_me(message: types.Message):
 
 
 @router.message(Command("forecast"))
-@logger.catch
 async def forecast_command(message: types.Message):
     """Returns a 5-day forecast for a given city."""
     parts = message.text.split(maxsplit=1)
@@ -274,15 +324,17 @@ async def forecast_command(message: types.Message):
         await message.answer("Please provide a city name:\n/forecast Moscow")
         return
     city = parts[1].strip()
-    response = get_forecast_response(city)
-    if str(response.get("cod")) == "404":
+    place = gazetteer.resolve(city)
+    try:
+        if place is not None:
+            forecast = await get_forecast(place.coordinates, place.name, place.country)
+        else:
+            forecast = await get_city_forecast(city)
+    except WrongInput:
         await message.answer("Oops, looks like there is no such city\nCheck the spelling")
         return
-    days = parse_forecast(response)
-    city_name = response.get("city", {}).get("name", city)
-    country_code = response.get("city", {}).get("country", "")
     await message.answer(
-        forecast_repr(days, city_name, country_code),
+        forecast_repr(forecast.days, forecast.city or city, forecast.country),
         parse_mode=ParseMode.HTML,
     )
 
@@ -292,20 +344,18 @@ async def forecast_command(message: types.Message):
 # ---------------------------------------------------------------------------
 
 @router.message(Command("save"))
-@logger.catch
 async def save_city_command(message: types.Message):
     """Save a city to the user's favourites."""
     parts = message.text.split(maxsplit=1)
     if len(parts) < 2:
         await message.answer("Please provide a city name:\n/save Stockholm")
         return
-    city = parts[1].strip()
-    response = get_openweather_city_response(city)
-    if str(response.get("cod")) == ERROR:
+    place = await _locate(parts[1].strip())
+    if place is None:
         await message.answer("\u274c That city wasn't found. Check the spelling before saving.")
         return
-    canonical = response.get("name", city)
-    status = fav.save_city(message.from_user.id, canonical)
+    canonical = place.name
+    status = await fav.save_city(message.from_user.id, canonical)
     if status == "saved":
         await message.answer(f"\u2764\ufe0f <b>{canonical}</b> saved to your favourites!", parse_mode=ParseMode.HTML)
     elif status == "duplicate":
@@ -321,7 +371,7 @@ async def save_city_command(message: types.Message):
 @router.message(Command("my"))
 async def my_cities_command(message: types.Message):
     """Show the user's saved favourite cities as tappable buttons."""
-    cities = fav.get_cities(message.from_user.id)
+    cities = await fav.get_cities(message.from_user.id)
     if not cities:
         await message.answer(
             "You have no saved cities yet.\nUse /save &lt;city&gt; to add one.",
@@ -338,7 +388,6 @@ async def my_cities_command(message: types.Message):
 
 
 @router.message(Command("remove"))
-@logger.catch
 async def remove_city_command(message: types.Message):
     """Remove a city from the user's favourites."""
     parts = message.text.split(maxsplit=1)
@@ -346,7 +395,7 @@ async def remove_city_command(message: types.Message):
         await message.answer("Please provide a city name:\n/remove Stockholm")
         return
     city = parts[1].strip()
-    removed = fav.remove_city(message.from_user.id, city)
+    removed = await fav.remove_city(message.from_user.id, city)
     if removed:
         await message.answer(f"\U0001f5d1 <b>{city}</b> removed from your favourites.", parse_mode=ParseMode.HTML)
     else:
@@ -354,7 +403,6 @@ async def remove_city_command(message: types.Message):
 
 
 @router.callback_query(F.data.startswith("fav:"))
-@logger.catch
 async def favourite_city_callback(callback: types.CallbackQuery):
     """Fetch and send weather when user taps a favourite city button."""
     city = callback.data[4:]
@@ -367,7 +415,6 @@ async def favourite_city_callback(callback: types.CallbackQuery):
 # ---------------------------------------------------------------------------
 
 @router.message(Command("subscribe"))
-@logger.catch
 async def subscribe_command(message: types.Message):
     """Subscribe to a daily weather report for a city at a given local time."""
     parts = message.text.split(maxsplit=2)
@@ -392,19 +439,17 @@ async def subscribe_command(message: types.Message):
         return
 
     # Validate city
-    response = get_openweather_city_response(city)
-    if str(response.get("cod")) == ERROR:
+    place = await _locate(city)
+    if place is None:
         await message.answer("\u274c City not found. Check the spelling.")
         return
 
-    canonical = response.get("name", city)
-    coords = get_coordinates_by_city(response)
-    tz_name = _tf.timezone_at(lat=coords.latitude, lng=coords.longitude) or "UTC"
+    canonical = place.name
+    tz_name = await timezone_name_async(place.coordinates) or "UTC"
     send_time = f"{hour:02d}:{minute:02d}"
 
     sub = dict(user_id=message.from_user.id, city=canonical, send_time=send_time, tz=tz_name)
-    subscriptions.save_subscription(**sub)
-    sched.add_or_replace_job(_send_subscription_weather, sub)
+    await subscriptions.save_subscription(**sub)
 
     await message.answer(
         f"\u23f0 Subscribed!\n"
@@ -417,8 +462,7 @@ async def subscribe_command(message: types.Message):
 @router.message(Command("unsubscribe"))
 async def unsubscribe_command(message: types.Message):
     """Cancel the user's daily weather subscription."""
-    removed = subscriptions.remove_subscription(message.from_user.id)
-    sched.remove_job(message.from_user.id)
+    removed = await subscriptions.remove_subscription(message.from_user.id)
     if removed:
         await message.answer("\u2705 Your daily subscription has been cancelled.")
     else:
@@ -428,7 +472,7 @@ async def unsubscribe_command(message: types.Message):
 @router.message(Command("mysub"))
 async def mysub_command(message: types.Message):
     """Show the user's current subscription."""
-    sub = subscriptions.get_subscription(message.from_user.id)
+    sub = await subscriptions.get_subscription(message.from_user.id)
     if not sub:
         await message.answer(
             "You don't have an active subscription.\n"
@@ -449,9 +493,12 @@ async def mysub_command(message: types.Message):
 # ---------------------------------------------------------------------------
 
 @router.message()
-@logger.catch
 async def weather_by_city(message: types.Message):
     """Returns current weather for a typed city name."""
+    if not message.text:
+        # stickers, photos and the like
+        await message.answer("Oops, looks like there is no such city\nCheck the spelling")
+        return
     await _send_city_weather(message, message.text)
 
 
@@ -460,11 +507,10 @@ async def weather_by_city(message: types.Message):
 # ---------------------------------------------------------------------------
 
 @router.inline_query()
-@logger.catch
 async def inline_weather(inline_query: types.InlineQuery):
-    """Handle inline queries: type @YourBot Stockholm in any chat."""
-    city = inline_query.query.strip()
-    if not city:
+    """Handle inline queries: type @YourBot Stock in any chat for matching cities."""
+    query = inline_query.query.strip()
+    if len(query) < INLINE_MIN_QUERY:
         await inline_query.answer(
             [],
             cache_time=1,
@@ -472,39 +518,84 @@ async def inline_weather(inline_query: types.InlineQuery):
             switch_pm_parameter="start",
         )
         return
+    user_id = inline_query.from_user.id
+    # Every keystroke is a new query; only the last one of a burst gets answered
+    if not await inline_debouncer.settle(user_id, inline_query.id):
+        return
     try:
-        response = get_openweather_city_response(city)
-        if str(response.get("cod")) == ERROR:
-            await inline_query.answer([], cache_time=1)
-            return
-        weather = get_weather(response)
-        text = (
-            f"\U0001f324 <b>{weather.city}</b>\n"
-            f"\U0001f321 {weather.temperature}\u00b0C  {feels_like_emoji(weather.feels_like)}\n"
-            f"{weather.weather_type.value}\n"
-            f"Feels like: {weather.feels_like}\u00b0C\n"
-            f"\U0001f4a8 Wind: {weather.wind_speed} m/s\n"
-            f"\U0001f4a7 Humidity: {weather.humidity}%\n"
-            f"\U0001f53d Pressure: {weather.pressure} hPa"
-        )
-        result = InlineQueryResultArticle(
-            id=str(uuid.uuid4()),
-            title=f"\U0001f324 {weather.city} \u2014 {weather.temperature}\u00b0C",
-            description=f"{weather.weather_type.value}  |  Feels like {weather.feels_like}\u00b0C",
+        found = await suggestions(query)
+    except Exception:
+        await inline_query.answer([], cache_time=1)
+        return
+    if not inline_debouncer.is_latest(user_id, inline_query.id):
+        SUPERSEDED.inc(stage="fetch")
+        return
+    results = []
+    for result_id, weather in found:
+        title, description, text = inline_repr(weather)
+        results.append(InlineQueryResultArticle(
+            id=result_id,
+            title=title,
+            description=description,
             input_message_content=InputTextMessageContent(
                 message_text=text,
                 parse_mode=ParseMode.HTML,
             ),
+        ))
+    await inline_query.answer(results, cache_time=INLINE_CACHE_TIME if results else 1)
+
+
+async def on_startup(bot: Bot) -> None:
+    global _metrics_runner
+    if METRICS_PORT:
+        _metrics_runner = await metrics.start_server(METRICS_HOST, int(METRICS_PORT))
+    if disk_cache is not None:
+        disk_cache.start()
+    sched.start(_deliver_subscription_city, leadership_from_env())
+    random_pool.start()
+    if WEBHOOK_URL:
+        # Every replica registers the same URL, so this is safe to repeat
+        await bot.set_webhook(
+            f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
         )
-        await inline_query.answer([result], cache_time=30)
-    except Exception:
-        await inline_query.answer([], cache_time=1)
 
 
-async def main():
-    sched.start(_send_subscription_weather)
-    await dp.start_polling(bot)
+async def on_shutdown() -> None:
+    # The webhook is left registered: other replicas may still be serving it
+    await sched.stop()
+    await random_pool.stop()
+    await close_session()
+    if disk_cache is not None:
+        await disk_cache.stop()
+    storage.close()
+    if _metrics_runner is not None:
+        await _metrics_runner.cleanup()
+
+
+def _run_webhook() -> None:
+    """Serve Telegram updates over HTTPS POSTs; updates are handled concurrently."""
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET,
+        handle_in_background=True,
+    ).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    # run_app stops on SIGINT/SIGTERM and gives in-flight requests time to finish
+    web.run_app(app, host=WEBAPP_HOST, port=WEBAPP_PORT, shutdown_timeout=10)
+
+
+def main() -> None:
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    if WEBHOOK_URL:
+        _run_webhook()
+    else:
+        asyncio.run(dp.start_polling(bot))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
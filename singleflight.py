@@ -0,0 +1,45 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight call.
+    Every caller awaiting a key gets the same result (or exception).
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.deduplicated = 0
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._inflight.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        else:
+            self.deduplicated += 1
+        # shield: one cancelled caller must not cancel the shared request
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # mark the exception as retrieved even if every caller went away
+            future.exception()
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._inflight),
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+        }
@@ -0,0 +1,144 @@
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar
+
+import metrics
+
+T = TypeVar("T")
+
+# Favourites and subscriptions share one database file; point several workers at the same one
+DB_PATH = Path(os.getenv("DATABASE_PATH") or Path(__file__).parent / "favourites.db")
+
+# Per-connection cache of prepared statements, reused across calls
+STATEMENT_CACHE_SIZE = 256
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.RLock()
+# Every awaited query runs on this one thread, so the event loop never blocks on disk
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+QUERY_SECONDS = metrics.Histogram(
+    "sqlite_query_seconds", "Execution time of storage functions on the DB thread", ("query",),
+)
+QUERY_WAIT_SECONDS = metrics.Histogram(
+    "sqlite_queue_wait_seconds", "Time awaited queries spent queued for the DB thread", ("query",),
+)
+
+# Schema changes, applied in order. PRAGMA user_version records how many have run,
+# so append new entries and never edit old ones.
+MIGRATIONS: list[str] = [
+    # 1: initial tables (databases from before migrations already have them)
+    """
+    CREATE TABLE IF NOT EXISTS favourites (
+        user_id  INTEGER NOT NULL,
+        city     TEXT    NOT NULL,
+        saved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, city COLLATE NOCASE)
+    );
+    CREATE TABLE IF NOT EXISTS subscriptions (
+        user_id   INTEGER PRIMARY KEY,
+        city      TEXT    NOT NULL,
+        send_time TEXT    NOT NULL,
+        tz        TEXT    NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_subscriptions_slot ON subscriptions (send_time, tz);
+    """,
+    # 2: covering index so a user's cities come back in save order without a sort
+    """
+    CREATE INDEX IF NOT EXISTS idx_favourites_user_saved ON favourites (user_id, saved_at, city);
+    """,
+    # 3: multi-worker mode — leader lease and per-day delivery claims
+    """
+    CREATE TABLE IF NOT EXISTS leases (
+        name       TEXT PRIMARY KEY,
+        owner      TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    ALTER TABLE subscriptions ADD COLUMN last_sent TEXT;
+    """,
+]
+
+
+def _open(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers (the scheduler) run alongside a writer (user commands)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA cache_size = -8000")  # 8 MB
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """Return the long-lived shared connection, opening it on first use."""
+    global _conn
+    if _conn is None:
+        _conn = _open(DB_PATH)
+    return _conn
+
+
+@contextmanager
+def connect() -> Iterator[sqlite3.Connection]:
+    """
+    Yield the shared connection inside a transaction.
+    Commits on success, rolls back on error; one caller at a time.
+    """
+    with _lock:
+        conn = get_connection()
+        with conn:
+            yield conn
+
+
+def migrate() -> int:
+    """Apply pending migrations, each in its own transaction. Returns the schema version."""
+    with _lock:
+        conn = get_connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.executescript(f"BEGIN; {script} PRAGMA user_version = {number}; COMMIT;")
+            version = number
+    return version
+
+
+def _timed(name: str, queued: float, fn: Callable[..., T], *args, **kwargs) -> T:
+    started = time.perf_counter()
+    QUERY_WAIT_SECONDS.observe(started - queued, query=name)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        QUERY_SECONDS.observe(time.perf_counter() - started, query=name)
+
+
+def threaded(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """
+    Turn a blocking storage function into a coroutine that runs on the DB thread.
+    The blocking version stays available as ``.sync`` for startup code and scripts.
+    """
+    name = f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        call = functools.partial(_timed, name, time.perf_counter(), fn, *args, **kwargs)
+        return await loop.run_in_executor(_executor, call)
+
+    wrapper.sync = fn
+    return wrapper
+
+
+def close() -> None:
+    """Close the shared connection (it is reopened on next use)."""
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
@@ -1,45 +1,25 @@
-import sqlite3
-from pathlib import Path
-
-# Reuse the same database file as favourites
-DB_PATH = Path(__file__).parent / "favourites.db"
-
-
-def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def init_subscriptions_table() -> None:
-    """Create the subscriptions table if it doesn't already exist."""
-    with _connect() as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS subscriptions (
-                user_id   INTEGER PRIMARY KEY,
-                city      TEXT    NOT NULL,
-                send_time TEXT    NOT NULL,
-                tz        TEXT    NOT NULL
-            )
-        """)
+import storage
 
 
+@storage.threaded
 def save_subscription(user_id: int, city: str, send_time: str, tz: str) -> None:
     """Insert or update a subscription for the user (one per user)."""
-    with _connect() as conn:
+    with storage.connect() as conn:
         conn.execute("""
             INSERT INTO subscriptions (user_id, city, send_time, tz)
             VALUES (?, ?, ?, ?)
             ON CONFLICT(user_id) DO UPDATE SET
                 city      = excluded.city,
                 send_time = excluded.send_time,
-                tz        = excluded.tz
+                tz        = excluded.tz,
+                last_sent = NULL
         """, (user_id, city, send_time, tz))
 
 
+@storage.threaded
 def get_subscription(user_id: int) -> dict | None:
     """Return the user's subscription, or None if not subscribed."""
-    with _connect() as conn:
+    with storage.connect() as conn:
         row = conn.execute(
             "SELECT * FROM subscriptions WHERE user_id = ?",
             (user_id,),
@@ -47,9 +27,10 @@ def get_subscription(user_id: int) -> dict | None:
     return dict(row) if row else None
 
 
+@storage.threaded
 def remove_subscription(user_id: int) -> bool:
     """Remove a subscription. Returns True if it existed."""
-    with _connect() as conn:
+    with storage.connect() as conn:
         cursor = conn.execute(
             "DELETE FROM subscriptions WHERE user_id = ?",
             (user_id,),
@@ -57,8 +38,49 @@ def remove_subscription(user_id: int) -> bool:
     return cursor.rowcount > 0
 
 
-def get_all_subscriptions() -> list[dict]:
-    """Return all subscriptions — used at bot startup to restore scheduled jobs."""
-    with _connect() as conn:
-        rows = conn.execute("SELECT * FROM subscriptions").fetchall()
+@storage.threaded
+def get_timezones() -> list[str]:
+    """Return every distinct time zone that has at least one subscription."""
+    with storage.connect() as conn:
+        rows = conn.execute("SELECT DISTINCT tz FROM subscriptions").fetchall()
+    return [row["tz"] for row in rows]
+
+
+@storage.threaded
+def get_due_subscriptions(send_time: str, timezones: list[str]) -> list[dict]:
+    """Return subscriptions set to send_time in any of the given time zones."""
+    if not timezones:
+        return []
+    placeholders = ", ".join("?" * len(timezones))
+    with storage.connect() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM subscriptions WHERE send_time = ? AND tz IN ({placeholders})",
+            (send_time, *timezones),
+        ).fetchall()
     return [dict(row) for row in rows]
+
+
+@storage.threaded
+def claim_deliveries(user_ids: list[int], local_date: str) -> list[int]:
+    """
+    Mark subscriptions as delivered for a local date and return the ones this call claimed.
+    Users already claimed for that date (by this or another worker) are left out.
+    """
+    claimed = []
+    with storage.connect() as conn:
+        # stay well under SQLite's bound-parameter limit
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = conn.execute(
+                f"""
+                UPDATE subscriptions SET last_sent = ?
+                WHERE user_id IN ({placeholders})
+                  AND (last_sent IS NULL OR last_sent <> ?)
+                RETURNING user_id
+                """,
+                (local_date, *chunk, local_date),
+            ).fetchall()
+            claimed.extend(row["user_id"] for row in rows)
+    return claimed
+
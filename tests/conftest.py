@@ -0,0 +1,17 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+import storage
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    storage.close()
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.db")
+    storage.migrate()
+    yield
+    storage.close()
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import breaker
+from breaker import BreakerState, CircuitBreaker
+from exceptions import ApiServiceError, UpstreamUnavailable
+
+
+async def _fail():
+    raise ApiServiceError
+
+
+async def _ok():
+    return "ok"
+
+
+def _call(b, fn):
+    return asyncio.run(b.call(fn, failures=(ApiServiceError,)))
+
+
+def test_opens_after_threshold_and_rejects(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(breaker.time, "monotonic", lambda: now[0])
+    b = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    for _ in range(2):
+        with pytest.raises(ApiServiceError):
+            _call(b, _fail)
+    assert b.state is BreakerState.OPEN
+    with pytest.raises(UpstreamUnavailable):
+        _call(b, _ok)
+    assert b.rejected == 1
+
+
+def test_half_open_probe_closes_or_reopens(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(breaker.time, "monotonic", lambda: now[0])
+    b = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    with pytest.raises(ApiServiceError):
+        _call(b, _fail)
+
+    now[0] += 31
+    with pytest.raises(ApiServiceError):
+        _call(b, _fail)
+    assert b.state is BreakerState.OPEN
+    assert b.opened == 2
+
+    now[0] += 31
+    assert _call(b, _ok) == "ok"
+    assert b.state is BreakerState.CLOSED
@@ -0,0 +1,47 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cache
+from cache import TTLCache, city_key, coords_key
+
+
+def test_keys_are_normalized():
+    assert city_key("  new   YORK ") == city_key("New York")
+    assert coords_key(59.33258, 18.0649) == coords_key(59.3341, 18.0612)
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    c = TTLCache(ttl=10)
+    c.set("a", 1)
+    assert c.get("a") == 1
+    now[0] += 11
+    assert c.get("a") is None
+    assert (c.hits, c.misses) == (1, 1)
+
+
+def test_lru_eviction():
+    c = TTLCache(ttl=60, maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.evictions == 1
+
+
+def test_stale_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    c = TTLCache(ttl=10, stale_ttl=20)
+    c.set("a", 1)
+    now[0] += 15
+    assert c.get("a") is None
+    assert c.get_stale("a") == 1
+    now[0] += 20
+    assert c.get_stale("a") is None
+    assert len(c) == 0
@@ -0,0 +1,39 @@
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+import subscriptions
+from coordination import SQLiteLease
+
+pytestmark = pytest.mark.usefixtures("temp_db")
+
+
+def test_only_one_worker_holds_the_lease():
+    first, second = SQLiteLease(lease_seconds=60), SQLiteLease(lease_seconds=60)
+
+    async def run():
+        return [await first.acquire(), await second.acquire(), await first.acquire()]
+
+    assert asyncio.run(run()) == [True, False, True]
+
+
+def test_expired_lease_is_taken_over():
+    first, second = SQLiteLease(lease_seconds=-1), SQLiteLease(lease_seconds=60)
+
+    async def run():
+        return [await first.acquire(), await second.acquire(), await first.acquire()]
+
+    assert asyncio.run(run()) == [True, True, False]
+
+
+def test_delivery_is_claimed_once_per_day():
+    for user_id in (1, 2):
+        subscriptions.save_subscription.sync(user_id, "Oslo", "08:00", "Europe/Oslo")
+    claim = subscriptions.claim_deliveries.sync
+    assert sorted(claim([1, 2], "2026-10-18")) == [1, 2]
+    assert claim([1, 2], "2026-10-18") == []
+    assert claim([1], "2026-10-19") == [1]
@@ -0,0 +1,34 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+import favourites
+import storage
+
+pytestmark = pytest.mark.usefixtures("temp_db")
+
+
+def test_migrate_is_idempotent():
+    assert storage.migrate() == len(storage.MIGRATIONS)
+
+
+def test_save_duplicate_and_limit():
+    save = favourites.save_city.sync
+    assert save(1, "Oslo") == "saved"
+    assert save(1, "OSLO") == "duplicate"
+    assert save(1, "Bergen") == "saved"
+    assert save(1, "Tromsø") == "saved"
+    assert save(1, "Oslo") == "duplicate"
+    assert save(1, "Stavanger") == "limit_reached"
+    assert save(2, "Stavanger") == "saved"
+    assert favourites.get_cities.sync(1) == ["Oslo", "Bergen", "Tromsø"]
+
+
+def test_remove_is_case_insensitive():
+    favourites.save_city.sync(1, "Stockholm")
+    assert favourites.remove_city.sync(1, "stockholm") is True
+    assert favourites.remove_city.sync(1, "Stockholm") is False
+    assert favourites.get_cities.sync(1) == []
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import sys
+import os
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+import forecast
+import weather_api_service as api
+from weather_api_service import Coordinates, parse_forecast
+
+FIXTURE = Path(__file__).parent / "fixtures" / "forecast.json"
+
+
+def test_days_aggregate_every_slot_of_the_local_day():
+    response = json.loads(FIXTURE.read_text())
+    days = parse_forecast(response)
+    assert len(days) == 5
+    offset = response["city"]["timezone"]
+    first_day = [item for item in response["list"]
+                 if (item["dt"] + offset) // 86400 == (response["list"][0]["dt"] + offset) // 86400]
+    assert days[0].temperature_min == min(item["main"]["temp_min"] for item in first_day)
+    assert days[0].temperature_max == max(item["main"]["temp_max"] for item in first_day)
+
+
+def test_forecast_is_parsed_once_per_refresh(monkeypatch):
+    response = json.loads(FIXTURE.read_text())
+    calls = 0
+
+    async def fake_fetch(url):
+        return response
+
+    def counting_build(raw):
+        nonlocal calls
+        calls += 1
+        return build(raw)
+
+    build = api.build_forecast
+    monkeypatch.setenv("OPEN_WEATHER_API_TOKEN", "test")
+    monkeypatch.setattr(api, "_fetch_json", fake_fetch)
+    monkeypatch.setattr(api, "build_forecast", counting_build)
+    api.forecast_cache.clear()
+
+    async def run():
+        first = await forecast.get_forecast(Coordinates(59.33, 18.06), "Stockholm", "SE")
+        second = await forecast.get_forecast(Coordinates(59.331, 18.061))
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert calls == 1
+    assert first.city == "Stockholm"
+    assert first.days == second.days
+    assert len(first.slots) == 40
+    # the cache holds the parsed forecast, not the raw response
+    assert isinstance(api.forecast_cache.get(("coords", (59.33, 18.06))), forecast.Forecast)
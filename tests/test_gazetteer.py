@@ -0,0 +1,57 @@
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+import gazetteer
+from gazetteer import Gazetteer, normalize
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    path = tmp_path_factory.mktemp("gazetteer") / "gazetteer.bin"
+    gazetteer.build(gazetteer.CITIES_PATH, path)
+    return Gazetteer(path)
+
+
+def test_resolve_names_and_aliases(index):
+    assert index.resolve("Stockholm").country == "SE"
+    assert index.resolve("  bombay ").name == "Mumbai"
+    assert index.resolve("Göteborg").name == "Gothenburg"
+    assert index.resolve("Atlantis") is None
+    assert normalize("Zürich") == "zurich"
+
+
+def test_resolve_returns_coordinates(index):
+    place = index.resolve("Sao Paulo")
+    assert place.name == "Sao Paulo"
+    assert place.coordinates.latitude == pytest.approx(-23.5505)
+
+
+def test_prefix_search_ranks_exact_matches_first(index):
+    names = [place.name for place in index.search("porto")]
+    assert names[0] == "Porto"
+    assert {"Porto Alegre", "Porto-Novo"} <= set(names)
+    assert len(index.search("san", limit=3)) == 3
+    assert index.search("xyzzy") == []
+    assert index.search("   ") == []
+
+
+def test_prefix_search_ranks_bigger_cities_first(index):
+    assert [place.name for place in index.search("new", limit=2)] == ["New York", "New Orleans"]
+    assert {"Shanghai", "Sao Paulo"} <= {place.name for place in index.search("s")}
+    # an alias match ("Tokio") never outranks a city's own name
+    assert index.search("to")[0].name == "Tokyo"
+    assert {place.country for place in index.search("san jose")} == {"US", "CR"}
+
+
+def test_build_replaces_the_index_without_leftovers(tmp_path):
+    path = tmp_path / "gazetteer.bin"
+    gazetteer.build(gazetteer.CITIES_PATH, path)
+    gazetteer.build(gazetteer.CITIES_PATH, path)
+    assert [p.name for p in tmp_path.iterdir()] == ["gazetteer.bin"]
+    assert Gazetteer(path).resolve("Oslo").country == "NO"
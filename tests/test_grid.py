@@ -0,0 +1,22 @@
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("h3")
+
+from grid import snap
+from weather_api_service import Coordinates
+
+
+def test_points_near_a_centre_share_its_cell():
+    cell = snap(Coordinates(59.3293, 18.0686), resolution=7)
+    nearby = Coordinates(cell.centre.latitude + 0.001, cell.centre.longitude - 0.001)
+    assert snap(nearby, resolution=7) == cell
+
+
+def test_centre_snaps_to_its_own_cell():
+    cell = snap(Coordinates(-33.8688, 151.2093), resolution=5)
+    assert snap(cell.centre, resolution=5) == cell
@@ -0,0 +1,97 @@
+import asyncio
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+import inline
+from exceptions import ApiServiceError, WrongInput
+from weather_repr import inline_repr
+from weather_api_service import CityWeather, Coordinates, Weather, WeatherType
+
+READING = Weather(
+    temperature=5.0, feels_like=2.0, temperature_min=3.0, temperature_max=7.0, humidity=80,
+    weather_type=WeatherType.CLOUDS, sunrise=1772686800, sunset=1772726800,
+    city="Kungsholmen", country="SE",
+)
+
+
+def test_only_the_latest_query_settles():
+    debouncer = inline.Debouncer(delay=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            debouncer.settle(1, "q1"),
+            debouncer.settle(1, "q2"),
+            debouncer.settle(2, "q3"),
+        )
+
+    assert asyncio.run(run()) == [False, True, True]
+    assert debouncer.is_latest(1, "q2")
+    assert not debouncer.is_latest(1, "q1")
+    assert inline.SUPERSEDED.values()[("debounce",)] >= 1
+
+
+def test_gazetteer_matches_are_named_after_the_city(monkeypatch):
+    async def current_weather(latitude, longitude):
+        return READING
+
+    monkeypatch.setattr(inline, "get_current_weather", current_weather)
+    results = asyncio.run(inline.suggestions("stockh"))
+    assert [weather.city for _, weather in results] == ["Stockholm"]
+    assert results[0][0].startswith("city:")
+
+
+def test_unknown_prefix_falls_back_to_a_name_lookup(monkeypatch):
+    queries = []
+
+    async def city_weather(city):
+        queries.append(city)
+        return CityWeather(READING._replace(city="Smallville"), Coordinates(38.5, -98.0))
+
+    monkeypatch.setattr(inline, "get_city_weather", city_weather)
+    first = asyncio.run(inline.suggestions("Smallville"))
+    again = asyncio.run(inline.suggestions("  smallville "))
+    assert queries == ["Smallville", "  smallville "]
+    assert [weather.city for _, weather in first] == ["Smallville"]
+    # the same city typed differently keeps its result id
+    assert first[0][0] == again[0][0]
+    assert first[0][0].startswith("q:")
+
+
+@pytest.mark.parametrize("error", [WrongInput("not found"), ApiServiceError()])
+def test_failed_fallback_gives_no_suggestions(monkeypatch, error):
+    async def city_weather(city):
+        raise error
+
+    monkeypatch.setattr(inline, "get_city_weather", city_weather)
+    assert asyncio.run(inline.suggestions("Atlantis")) == []
+
+
+def test_unexpected_errors_are_not_swallowed(monkeypatch):
+    async def city_weather(city):
+        raise RuntimeError("bug")
+
+    monkeypatch.setattr(inline, "get_city_weather", city_weather)
+    with pytest.raises(RuntimeError):
+        asyncio.run(inline.suggestions("Atlantis"))
+
+
+def test_short_queries_fetch_nothing(monkeypatch):
+    async def current_weather(latitude, longitude):
+        raise AssertionError("fetched weather for a short query")
+
+    monkeypatch.setattr(inline, "get_current_weather", current_weather)
+    monkeypatch.setattr(inline, "get_city_weather", current_weather)
+    assert asyncio.run(inline.suggestions("s")) == []
+    assert asyncio.run(inline.suggestions(" sa ")) == []
+
+
+def test_same_named_cities_have_distinct_titles():
+    us, cr = (inline_repr(READING._replace(city="San Jose", country=country)) for country in ("US", "CR"))
+    assert us[0] != cr[0]
+    assert inline_repr(READING._replace(country=None))[0].startswith("\U0001f324 Kungsholmen \u2014")
@@ -0,0 +1,56 @@
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test", ("kind",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, kind="a")
+    histogram.observe(0.5, kind="a")
+    histogram.observe(5, kind="a")
+
+    text = metrics.render()
+    assert "# TYPE test_seconds histogram" in text
+    assert 'test_seconds_bucket{kind="a",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{kind="a",le="1.0"} 2' in text
+    assert 'test_seconds_bucket{kind="a",le="+Inf"} 3' in text
+    assert 'test_seconds_count{kind="a"} 3' in text
+
+
+def test_middleware_labels_by_handler_and_counts_errors():
+    middleware = metrics.HandlerTimingMiddleware()
+
+    class Handler:
+        async def callback(self):
+            pass
+
+    async def failing(event, data):
+        raise ValueError
+
+    async def run():
+        try:
+            await middleware(failing, "event", {"handler": Handler()})
+        except ValueError:
+            pass
+
+    asyncio.run(run())
+    text = metrics.render()
+    assert 'bot_handler_seconds_count{handler="callback",event="str"} 1' in text
+    assert 'bot_handler_errors_total{handler="callback",event="str"} 1' in text
+
+
+def test_counts_and_values_are_snapshots_per_label_set():
+    counter = metrics.Counter("test_snapshot_total", "Test", ("kind",))
+    histogram = metrics.Histogram("test_snapshot_seconds", "Test", ("kind",))
+    counter.inc(kind="a")
+    histogram.observe(0.1, kind="a")
+    histogram.observe(0.2, kind="a")
+
+    values, counts = counter.values(), histogram.counts()
+    counter.inc(kind="a")
+    assert values == {("a",): 1}
+    assert counts == {("a",): 2}
@@ -0,0 +1,49 @@
+import asyncio
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("loguru")
+
+from persistent_cache import PersistentCache
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = tmp_path / "cache.db"
+
+    async def write():
+        cache = PersistentCache(path)
+        cache.put("weather", ("city", "oslo"), {"cod": 200, "name": "Oslo"}, ttl=60)
+        await cache.stop()
+
+    async def read():
+        cache = PersistentCache(path)
+        try:
+            return await cache.get("weather", ("city", "oslo")), await cache.get("weather", ("city", "rome"))
+        finally:
+            await cache.stop()
+
+    asyncio.run(write())
+    (value, ttl), missing = asyncio.run(read())
+    assert value == {"cod": 200, "name": "Oslo"}
+    assert 0 < ttl <= 60
+    assert missing is None
+
+
+def test_compaction_drops_expired_and_trims_to_maxsize(tmp_path):
+    async def run():
+        cache = PersistentCache(tmp_path / "cache.db", maxsize=2)
+        cache.put("air", "expired", {}, ttl=-1)
+        for i in range(3):
+            cache.put("air", i, {"i": i}, ttl=60 + i)
+        removed = await cache.compact()
+        kept = [await cache.get("air", i) is not None for i in range(3)]
+        await cache.stop()
+        return removed, kept
+
+    removed, kept = asyncio.run(run())
+    assert removed == 2
+    assert kept == [False, True, True]
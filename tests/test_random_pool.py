@@ -0,0 +1,123 @@
+import asyncio
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("loguru")
+
+from random_pool import RandomPool
+
+
+def _counter():
+    produced = 0
+
+    async def produce():
+        nonlocal produced
+        produced += 1
+        return produced
+
+    return produce
+
+
+def test_take_serves_prefetched_items():
+    async def run():
+        pool = RandomPool(_counter(), size=3, producers=1)
+        pool.start()
+        await asyncio.sleep(0.01)
+        assert len(pool) == 3
+        assert await pool.take() == 1
+        await pool.stop()
+        return pool
+
+    pool = asyncio.run(run())
+    assert pool.served == 1
+    assert pool.produced_inline == 0
+
+
+def test_expired_items_are_dropped():
+    async def run():
+        pool = RandomPool(_counter(), size=2, producers=1, max_age=0)
+        pool.start()
+        await asyncio.sleep(0.01)
+        await pool.stop()
+        await asyncio.sleep(0.001)
+        await pool.take()
+        return pool
+
+    pool = asyncio.run(run())
+    assert pool.served == 0
+    assert pool.expired >= 1
+    assert pool.produced_inline == 1
+
+
+def test_empty_pool_produces_inline():
+    async def run():
+        pool = RandomPool(_counter(), size=0)
+        pool.start()
+        return await pool.take(), pool
+
+    item, pool = asyncio.run(run())
+    assert item == 1
+    assert pool.produced_inline == 1
+
+
+def test_producers_wait_for_a_free_slot():
+    produce = _counter()
+    produced = []
+
+    async def tracked():
+        produced.append(await produce())
+        return produced[-1]
+
+    async def run():
+        pool = RandomPool(tracked, size=2, producers=1, max_age=60)
+        pool.start()
+        await asyncio.sleep(0.01)
+        # full: nothing is produced ahead of a free slot
+        assert produced == [1, 2]
+        assert await pool.take() == 1
+        await asyncio.sleep(0.01)
+        assert produced == [1, 2, 3]
+        assert len(pool) == 2
+        await pool.stop()
+
+    asyncio.run(run())
+
+
+def test_idle_full_pool_makes_no_calls():
+    produce = _counter()
+    produced = []
+
+    async def tracked():
+        produced.append(await produce())
+        return produced[-1]
+
+    async def run():
+        pool = RandomPool(tracked, size=2, producers=2, max_age=0.01)
+        pool.start()
+        await asyncio.sleep(0.1)
+        await pool.stop()
+
+    asyncio.run(run())
+    assert produced == [1, 2]
+
+
+def test_take_drops_expired_items_and_refills_them():
+    async def run():
+        pool = RandomPool(_counter(), size=2, producers=1, max_age=0.05)
+        pool.start()
+        await asyncio.sleep(0.1)
+        # both prefetched items are stale: dropped, and one is produced inline
+        item = await pool.take()
+        await asyncio.sleep(0.01)
+        refilled = len(pool)
+        await pool.stop()
+        return item, refilled, pool
+
+    item, refilled, pool = asyncio.run(run())
+    assert item == 3
+    assert pool.expired == 2
+    assert refilled == 2
@@ -0,0 +1,120 @@
+import asyncio
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiogram")
+
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+import ratelimit
+from ratelimit import SendLimiter, TokenBucket
+
+METHOD = SendMessage(chat_id=1, text="hi")
+
+
+class FakeClock:
+    """Stands in for time.monotonic and asyncio.sleep: sleeping advances the clock at once."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept: list[float] = []
+        self._sleep = asyncio.sleep
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        # a real clock always moves on, even after a sleep rounded down to nothing
+        self.now += max(seconds, 1e-6)
+        await self._sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    monkeypatch.setattr(ratelimit.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def failing(*errors):
+    """A send call that raises the given errors in turn, then returns "ok"."""
+    remaining = list(errors)
+
+    async def call():
+        if remaining:
+            raise remaining.pop(0)
+        return "ok"
+
+    return call
+
+
+def test_bucket_serves_a_burst_then_paces_at_rate(clock):
+    bucket = TokenBucket(rate=4, capacity=2)
+
+    async def run():
+        times = []
+        for _ in range(5):
+            await bucket.acquire()
+            times.append(clock.now - 1000)
+        return times
+
+    assert asyncio.run(run()) == pytest.approx([0, 0, 0.25, 0.5, 0.75], abs=1e-5)
+
+
+def test_paused_bucket_waits_out_the_pause(clock):
+    bucket = TokenBucket(rate=4, capacity=4)
+    bucket.pause(5)
+    asyncio.run(bucket.acquire())
+    assert clock.now - 1000 == pytest.approx(5.25, abs=1e-5)
+
+
+def test_each_chat_is_paced_separately(clock):
+    limiter = SendLimiter(global_rate=100, chat_rate=1, chat_burst=1)
+
+    async def run():
+        await limiter.send(1, failing())
+        await limiter.send(2, failing())
+        first_two = clock.now - 1000
+        await limiter.send(1, failing())
+        return first_two, clock.now - 1000
+
+    first_two, total = asyncio.run(run())
+    assert first_two == 0
+    assert total == pytest.approx(1.0, abs=1e-5)
+    assert limiter.sent == 3
+
+
+def test_retry_after_pauses_sending_for_the_whole_bot(clock):
+    limiter = SendLimiter()
+    call = failing(TelegramRetryAfter(METHOD, "Too Many Requests", retry_after=7))
+
+    assert asyncio.run(limiter.send(1, call)) == "ok"
+    assert 7 in clock.slept
+    assert clock.now - 1000 >= 7
+    assert limiter.stats() == {"sent": 1, "retried": 1, "failed": 0}
+
+
+def test_network_errors_back_off_exponentially(clock):
+    limiter = SendLimiter(chat_burst=10)
+    call = failing(TelegramNetworkError(METHOD, "reset"), TelegramNetworkError(METHOD, "reset"))
+
+    assert asyncio.run(limiter.send(1, call)) == "ok"
+    backoffs = [seconds for seconds in clock.slept if seconds >= ratelimit.BACKOFF_BASE]
+    assert backoffs == [ratelimit.BACKOFF_BASE, ratelimit.BACKOFF_BASE * 2]
+    assert limiter.retried == 2
+
+
+def test_gives_up_after_max_retries(clock):
+    limiter = SendLimiter(chat_burst=10)
+    call = failing(*[TelegramNetworkError(METHOD, "reset")] * (ratelimit.MAX_RETRIES + 1))
+
+    with pytest.raises(TelegramNetworkError):
+        asyncio.run(limiter.send(1, call))
+    assert limiter.stats() == {"sent": 0, "retried": ratelimit.MAX_RETRIES, "failed": 1}
@@ -0,0 +1,133 @@
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("apscheduler")
+
+import pytz
+
+import scheduler
+import subscriptions
+from coordination import LocalLeadership
+
+SLOT = datetime(2026, 10, 18, 6, 0, tzinfo=pytz.utc)
+
+
+class ScriptedLeadership:
+    """Answers acquire() from a list, then keeps repeating the last answer."""
+
+    def __init__(self, *answers: bool):
+        self.answers = list(answers)
+        self.calls = 0
+
+    async def acquire(self) -> bool:
+        self.calls += 1
+        return self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+
+    async def release(self) -> None:
+        pass
+
+
+def test_lease_is_renewed_during_a_long_delivery(monkeypatch):
+    leadership = ScriptedLeadership(True)
+    monkeypatch.setattr(scheduler, "_leadership", leadership)
+    monkeypatch.setattr(scheduler, "RENEW_INTERVAL", 0.01)
+
+    async def slow_slot(slot, deliver_city):
+        await asyncio.sleep(0.05)
+
+    monkeypatch.setattr(scheduler, "deliver_slot", slow_slot)
+    assert asyncio.run(scheduler._deliver_as_leader(SLOT, None)) is True
+    assert leadership.calls >= 3
+
+
+def test_delivery_stops_when_the_lease_is_lost(monkeypatch):
+    monkeypatch.setattr(scheduler, "_leadership", ScriptedLeadership(True, False))
+    monkeypatch.setattr(scheduler, "RENEW_INTERVAL", 0.01)
+    sent = []
+
+    async def endless_slot(slot, deliver_city):
+        while True:
+            sent.append(slot)
+            await asyncio.sleep(0.005)
+
+    monkeypatch.setattr(scheduler, "deliver_slot", endless_slot)
+
+    async def run():
+        return await asyncio.wait_for(scheduler._deliver_as_leader(SLOT, None), 1)
+
+    assert asyncio.run(run()) is False
+    assert 0 < len(sent) < 20
+
+
+def test_zones_are_grouped_by_local_date_and_time():
+    groups = scheduler._zones_by_local_time(
+        SLOT, ["Europe/Oslo", "Asia/Tokyo", "Europe/Stockholm", "Not/AZone"],
+    )
+    assert groups == {
+        ("2026-10-18", "08:00"): ["Europe/Oslo", "Europe/Stockholm"],
+        ("2026-10-18", "15:00"): ["Asia/Tokyo"],
+        ("2026-10-18", "06:00"): ["Not/AZone"],  # unknown zones fall back to UTC
+    }
+
+
+@pytest.mark.usefixtures("temp_db")
+def test_slot_delivers_each_city_once_to_its_due_subscribers():
+    save = subscriptions.save_subscription.sync
+    save(1, "Oslo", "08:00", "Europe/Oslo")
+    save(2, "Oslo", "08:00", "Europe/Stockholm")
+    save(3, "Tokyo", "15:00", "Asia/Tokyo")
+    save(4, "Oslo", "09:00", "Europe/Oslo")
+    calls = []
+
+    async def deliver_city(city, user_ids):
+        calls.append((city, sorted(user_ids)))
+
+    async def run():
+        await scheduler.deliver_slot(SLOT, deliver_city)
+        # a catch-up or second worker replaying the same minute sends nothing
+        await scheduler.deliver_slot(SLOT, deliver_city)
+
+    asyncio.run(run())
+    assert sorted(calls) == [("Oslo", [1, 2]), ("Tokyo", [3])]
+
+
+@pytest.mark.parametrize("last_slot, expected", [
+    (SLOT - timedelta(minutes=3), 3),
+    (None, scheduler.TAKEOVER_CATCH_UP_MINUTES + 1),
+    (SLOT - timedelta(days=1), scheduler.MAX_CATCH_UP_MINUTES + 1),
+])
+def test_tick_catches_up_on_missed_minutes(monkeypatch, last_slot, expected):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return SLOT + timedelta(seconds=42)
+
+    slots = []
+
+    async def record(slot, deliver_city):
+        slots.append(slot)
+
+    monkeypatch.setattr(scheduler, "datetime", FrozenDatetime)
+    monkeypatch.setattr(scheduler, "deliver_slot", record)
+    monkeypatch.setattr(scheduler, "_leadership", LocalLeadership())
+    monkeypatch.setattr(scheduler, "_last_slot", last_slot)
+
+    asyncio.run(scheduler._tick(None))
+    assert len(slots) == expected
+    assert slots[-1] == SLOT
+    assert all(b - a == timedelta(minutes=1) for a, b in zip(slots, slots[1:]))
+    assert scheduler._last_slot == SLOT
+
+
+def test_tick_does_nothing_on_a_follower(monkeypatch):
+    monkeypatch.setattr(scheduler, "_leadership", ScriptedLeadership(False))
+    monkeypatch.setattr(scheduler, "_last_slot", SLOT)
+    asyncio.run(scheduler._tick(None))
+    # a later takeover starts from the short look-back, not from a stale slot
+    assert scheduler._last_slot is None
@@ -0,0 +1,43 @@
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+    started = 0
+
+    async def fetch():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.01)
+        return {"cod": 200}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("stockholm", fetch) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert started == 1
+    assert all(r == {"cod": 200} for r in results)
+    assert (flight.calls, flight.deduplicated) == (1, 4)
+    assert len(flight) == 0
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(
+            *(flight.do("oslo", fetch) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import os
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("timezonefinder")
+pytest.importorskip("h3")
+
+import timezoneutils
+import tz_index
+from weather_api_service import Coordinates
+
+STOCKHOLM = Coordinates(59.3293, 18.0686)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    timezoneutils.zone_cache.clear()
+    # no H3 index unless a test provides one
+    monkeypatch.setattr(tz_index, "lookup", lambda latitude, longitude: None)
+    yield
+    timezoneutils.zone_cache.clear()
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Counts polygon lookups; each one is slow enough for callers to overlap."""
+    calls = []
+
+    def slow_lookup(latitude, longitude):
+        calls.append((latitude, longitude))
+        time.sleep(0.05)
+        return "Europe/Stockholm"
+
+    monkeypatch.setattr(timezoneutils, "_lookup", slow_lookup)
+    return calls
+
+
+def test_polygon_lookup_finds_the_zone():
+    assert timezoneutils.timezone_name(STOCKHOLM) == "Europe/Stockholm"
+    assert timezoneutils.zone_cache.get((59.329, 18.069)) == "Europe/Stockholm"
+
+
+def test_concurrent_misses_share_one_lookup(lookups):
+    nearby = [Coordinates(59.3293 + i * 1e-5, 18.0686) for i in range(5)]
+
+    async def run():
+        return await asyncio.gather(*map(timezoneutils.timezone_name_async, nearby))
+
+    assert asyncio.run(run()) == ["Europe/Stockholm"] * 5
+    assert lookups == [(59.329, 18.069)]
+    # later calls are answered from the cache
+    assert asyncio.run(timezoneutils.timezone_name_async(STOCKHOLM)) == "Europe/Stockholm"
+    assert len(lookups) == 1
+
+
+def test_index_answers_before_the_polygon_search(monkeypatch, lookups):
+    monkeypatch.setattr(tz_index, "lookup", lambda latitude, longitude: "Europe/Oslo")
+    assert asyncio.run(timezoneutils.timezone_name_async(Coordinates(59.91, 10.75))) == "Europe/Oslo"
+    assert lookups == []
+
+
+def test_points_without_a_zone_are_cached_as_unknown(monkeypatch):
+    calls = []
+
+    def no_zone(latitude, longitude):
+        calls.append((latitude, longitude))
+        return ""
+
+    monkeypatch.setattr(timezoneutils, "_lookup", no_zone)
+    ocean = Coordinates(-40.0, -120.0)
+    assert asyncio.run(timezoneutils.timezone_name_async(ocean)) is None
+    assert asyncio.run(timezoneutils.timezone_name_async(ocean)) is None
+    assert len(calls) == 1
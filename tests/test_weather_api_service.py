@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import sys
+import os
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+import weather_api_service as api
+from breaker import BreakerState, CircuitBreaker
+from exceptions import ApiServiceError, UpstreamUnavailable, WrongInput
+from persistent_cache import PersistentCache
+
+FIXTURES = Path(__file__).parent / "fixtures"
+STOCKHOLM = (59.3326, 18.0649)
+KEY = ("coords", (59.33, 18.06))
+
+
+def _fixture(name: str) -> dict:
+    return json.loads((FIXTURES / name).read_text())
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    monkeypatch.setenv("OPEN_WEATHER_API_TOKEN", "test")
+    monkeypatch.setattr(api, "breaker", CircuitBreaker(failure_threshold=1))
+    monkeypatch.setattr(api, "disk_cache", None)
+    for cache in (api.weather_cache, api.air_cache, api.forecast_cache):
+        cache.clear()
+    yield
+    for cache in (api.weather_cache, api.air_cache, api.forecast_cache):
+        cache.clear()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Replaces the HTTP fetch; set ``.response`` (a dict or an exception) before calling."""
+
+    class Upstream:
+        response = _fixture("weather.json")
+        calls = 0
+
+    async def fetch(url):
+        Upstream.calls += 1
+        if isinstance(Upstream.response, Exception):
+            raise Upstream.response
+        return Upstream.response
+
+    monkeypatch.setattr(api, "_fetch_json", fetch)
+    return Upstream
+
+
+async def _settle_refreshes() -> None:
+    # wait for background refreshes without retrieving their results
+    while api._refreshes:
+        await asyncio.sleep(0)
+
+
+def test_stale_value_is_served_while_a_refresh_replaces_it(upstream):
+    old = api.get_weather(upstream.response)._replace(temperature=-30.0)
+    api.weather_cache.set(KEY, old, ttl=-1)
+
+    async def run():
+        served = await api.get_current_weather(*STOCKHOLM)
+        await _settle_refreshes()
+        return served
+
+    assert asyncio.run(run()) is old
+    assert upstream.calls == 1
+    assert api.weather_cache.get(KEY).temperature == 4.21
+
+
+def test_failed_refresh_keeps_the_stale_value(upstream, caplog):
+    old = api.get_weather(upstream.response)
+    api.weather_cache.set(KEY, old, ttl=-1)
+    upstream.response = ApiServiceError()
+
+    async def run():
+        served = await api.get_current_weather(*STOCKHOLM)
+        await _settle_refreshes()
+        return served
+
+    with caplog.at_level(logging.ERROR, logger="asyncio"):
+        assert asyncio.run(run()) is old
+    assert upstream.calls == 1
+    assert api.weather_cache.get(KEY) is None
+    assert api.weather_cache.get_stale(KEY) is old
+    assert "never retrieved" not in caplog.text
+
+
+def test_not_found_raises_without_caching_or_tripping_the_breaker(monkeypatch):
+    async def request(url, endpoint):
+        return _fixture("city_not_found.json")
+
+    monkeypatch.setattr(api, "_request_json", request)
+    with pytest.raises(WrongInput):
+        asyncio.run(api.get_city_weather("Nowhere"))
+    assert len(api.weather_cache) == 0
+    assert api.breaker.state is BreakerState.CLOSED
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: bytes):
+        self.status = status
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeSession:
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.calls = 0
+
+    def get(self, url):
+        self.calls += 1
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+@pytest.mark.parametrize("outcome", [
+    FakeResponse(500, b'{"cod": 500}'),
+    FakeResponse(503, b"Service Unavailable"),
+    FakeResponse(429, b'{"cod": 429}'),
+    asyncio.TimeoutError(),
+    FakeResponse(200, b"<html>not json</html>"),
+], ids=["500", "503", "429", "timeout", "bad-json"])
+def test_upstream_failures_open_the_breaker(monkeypatch, outcome):
+    session = FakeSession(outcome)
+    monkeypatch.setattr(api, "_get_session", lambda: session)
+
+    with pytest.raises(ApiServiceError):
+        asyncio.run(api.get_current_weather(*STOCKHOLM))
+    assert api.breaker.state is BreakerState.OPEN
+    # open: the next call fails fast without a request
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(api.get_current_weather(*STOCKHOLM))
+    assert session.calls == 1
+    assert len(api.weather_cache) == 0
+
+
+def test_restart_reads_through_the_disk_cache(monkeypatch, upstream, tmp_path):
+    async def first_run():
+        monkeypatch.setattr(api, "disk_cache", PersistentCache(tmp_path / "cache.db"))
+        weather = await api.get_current_weather(*STOCKHOLM)
+        await api.disk_cache.stop()
+        return weather
+
+    async def second_run():
+        monkeypatch.setattr(api, "disk_cache", PersistentCache(tmp_path / "cache.db"))
+        try:
+            return await api.get_current_weather(*STOCKHOLM)
+        finally:
+            await api.disk_cache.stop()
+
+    fetched = asyncio.run(first_run())
+    api.weather_cache.clear()
+    upstream.response = ApiServiceError()
+    restored = asyncio.run(second_run())
+    assert upstream.calls == 1
+    assert restored == fetched
+    assert api.weather_cache.get(KEY) == fetched
+
+
+def test_disk_hit_expires_from_memory_on_its_stored_deadline(monkeypatch, upstream, tmp_path):
+    disk = PersistentCache(tmp_path / "cache.db")
+    monkeypatch.setattr(api, "disk_cache", disk)
+
+    async def run():
+        # left by a previous run, with 0.2 s of its TTL to go
+        disk.put(api.weather_cache.name, KEY, _fixture("weather.json"), ttl=0.2)
+        weather = await api.get_current_weather(*STOCKHOLM)
+        await disk.stop()
+        return weather
+
+    assert asyncio.run(run()).city == "Stockholm"
+    assert upstream.calls == 0
+    assert api.weather_cache.get(KEY) is not None
+    asyncio.run(asyncio.sleep(0.3))
+    assert api.weather_cache.get(KEY) is None
+
+
+def _without(payload: dict, *path) -> dict:
+    """A deep copy of ``payload`` with the field at ``path`` removed."""
+    payload = json.loads(json.dumps(payload))
+    parent = payload
+    for step in path[:-1]:
+        parent = parent[step]
+    del parent[path[-1]]
+    return payload
+
+
+def test_weather_fixture_parses():
+    weather = api._parse_openweather_response(_fixture("weather.json"))
+    assert (weather.city, weather.country) == ("Stockholm", "SE")
+    assert weather.temperature == 4.21
+    assert weather.feels_like == 0.93
+    assert weather.humidity == 81
+    assert weather.weather_type == api.WeatherType.CLOUDS
+    assert (weather.sunrise, weather.sunset) == (1772689526, 1772729129)
+    assert weather.wind_speed == 4.6
+    assert weather.pressure == 1012
+
+
+def test_city_weather_fixture_parses():
+    city_weather = api._parse_city_weather(_fixture("weather.json"))
+    assert city_weather.weather.city == "Stockholm"
+    assert city_weather.coordinates == api.Coordinates(latitude=59.3326, longitude=18.0649)
+
+
+def test_air_pollution_fixture_parses():
+    assert api.get_air_quality_type(_fixture("air_pollution.json")) == api.AirQualityType.FAIR
+
+
+@pytest.mark.parametrize("parse", [api._parse_openweather_response, api._parse_city_weather,
+                                   api.get_air_quality_type])
+def test_not_found_payload_is_rejected(parse):
+    with pytest.raises(ApiServiceError):
+        parse(_fixture("city_not_found.json"))
+
+
+@pytest.mark.parametrize("path", [
+    ("main",), ("main", "temp"), ("main", "humidity"), ("weather",), ("sys", "sunset"), ("name",),
+])
+def test_weather_missing_a_field_is_rejected(path):
+    payload = _without(_fixture("weather.json"), *path)
+    with pytest.raises(ApiServiceError):
+        api._parse_openweather_response(payload)
+    with pytest.raises(ApiServiceError):
+        api._parse_city_weather(payload)
+
+
+@pytest.mark.parametrize("path", [("coord",), ("coord", "lat")])
+def test_city_weather_missing_coordinates_is_rejected(path):
+    with pytest.raises(ApiServiceError):
+        api._parse_city_weather(_without(_fixture("weather.json"), *path))
+
+
+@pytest.mark.parametrize("path", [("list",), ("list", 0), ("list", 0, "main", "aqi")])
+def test_air_pollution_missing_a_field_is_rejected(path):
+    with pytest.raises(ApiServiceError):
+        api.get_air_quality_type(_without(_fixture("air_pollution.json"), *path))
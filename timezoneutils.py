@@ -1,24 +1,138 @@
+import asyncio
+import functools
+import math
+import threading
 import timezonefinder
 import pytz
 
-from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
 from datetime import datetime
 
+import metrics
+import tz_index
+from cache import TTLCache
+from singleflight import SingleFlight
 from weather_api_service import Coordinates
 
+# Coordinates are rounded to this many decimals (~110 m) before lookup
+TZ_PRECISION = 3
+# Polygon lookups run off the event loop on this many worker threads
+TZ_WORKERS = 1
+
+_finder: Optional[timezonefinder.TimezoneFinder] = None
+_finder_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=TZ_WORKERS, thread_name_prefix="timezone")
+
+# Rounded (lat, lon) -> IANA name; "" marks points with no known zone
+zone_cache = TTLCache(ttl=math.inf, maxsize=65_536, name="timezone")
+metrics.track_cache(zone_cache)
+# Concurrent misses for one rounded point share a polygon lookup
+_lookup_flight = SingleFlight()
+
 
 class SunTime(NamedTuple):
     sunset: datetime
     sunrise: datetime
 
 
-def timezone(coordinates: Coordinates) -> [str, str]:
-    """Returns Area and Local Time"""
-    tf = timezonefinder.TimezoneFinder()
-    timezone_str = tf.certain_timezone_at(lat=coordinates.latitude, lng=coordinates.longitude)
+LOOKUP_SECONDS = metrics.Histogram(
+    "timezone_lookup_seconds", "Uncached polygon lookups, measured on the worker thread",
+)
+INDEX_HITS = metrics.Counter("timezone_index_hits_total", "Zones answered by the H3 index")
+# Polygon lookups waiting for, or running on, the worker pool
+_queue_depth = 0
+metrics.Collected(
+    "timezone_lookup_queue_depth", "Polygon lookups queued or running", "gauge", (),
+    lambda: [((), _queue_depth)],
+)
+metrics.Collected(
+    "timezone_singleflight_total", "Polygon lookups requested, and how many joined one in flight",
+    "counter", ("result",),
+    lambda: [(("started",), _lookup_flight.calls),
+             (("deduplicated",), _lookup_flight.deduplicated)],
+)
+
+
+def _get_finder() -> timezonefinder.TimezoneFinder:
+    """Builds the finder once; loading its polygon data is expensive."""
+    global _finder
+    if _finder is None:
+        _finder = timezonefinder.TimezoneFinder()
+    return _finder
+
+
+def _lookup(latitude: float, longitude: float) -> str:
+    with LOOKUP_SECONDS.time():
+        # TimezoneFinder reads shared file handles and is not thread-safe
+        with _finder_lock:
+            timezone_str = _get_finder().certain_timezone_at(lat=latitude, lng=longitude)
+    return timezone_str or ""
+
+
+def _key(coordinates: Coordinates) -> tuple[float, float]:
+    return (
+        round(coordinates.latitude, TZ_PRECISION),
+        round(coordinates.longitude, TZ_PRECISION),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _zone(timezone_str: str) -> pytz.BaseTzInfo:
+    return pytz.timezone(timezone_str)
+
+
+def _from_index(key: tuple[float, float]) -> Optional[str]:
+    """Reads the precomputed H3 index; None means a border cell or no index."""
+    timezone_str = tz_index.lookup(*key)
+    if timezone_str is not None:
+        INDEX_HITS.inc()
+        zone_cache.set(key, timezone_str)
+    return timezone_str
+
+
+def timezone_name(coordinates: Coordinates) -> Optional[str]:
+    """
+    Returns the IANA time zone name for coordinates, or None if unknown.
+    Blocks on a polygon lookup; prefer timezone_name_async inside handlers.
+    """
+    key = _key(coordinates)
+    timezone_str = zone_cache.get(key)
+    if timezone_str is None:
+        timezone_str = _from_index(key)
+    if timezone_str is None:
+        timezone_str = _lookup(*key)
+        zone_cache.set(key, timezone_str)
+    return timezone_str or None
+
+
+async def _lookup_async(key: tuple[float, float]) -> str:
+    global _queue_depth
+    _queue_depth += 1
+    try:
+        loop = asyncio.get_running_loop()
+        timezone_str = await loop.run_in_executor(_executor, _lookup, *key)
+    finally:
+        _queue_depth -= 1
+    zone_cache.set(key, timezone_str)
+    return timezone_str
+
+
+async def timezone_name_async(coordinates: Coordinates) -> Optional[str]:
+    """Same as timezone_name, but cache misses run on the worker pool, once per point."""
+    key = _key(coordinates)
+    timezone_str = zone_cache.get(key)
+    if timezone_str is None:
+        timezone_str = _from_index(key)
+    if timezone_str is None:
+        timezone_str = await _lookup_flight.do(key, lambda: _lookup_async(key))
+    return timezone_str or None
+
+
+def _area_and_local_time(timezone_str: Optional[str]) -> [str, str]:
     fmt = '%H:%M'
     if timezone_str:
-        cur_timezone = pytz.timezone(timezone_str)
+        cur_timezone = _zone(timezone_str)
         dt = datetime.utcnow()
         # method utcoffset() returns the UTC offset for a timezone instance
         local_time = dt + cur_timezone.utcoffset(dt)
@@ -28,14 +142,31 @@ def timezone(coordinates: Coordinates) -> [str, str]:
         return
 
 
-def sun_condition(sunrise: float, sunset: float, coordinates: Coordinates) -> SunTime:
-    """Returns sunrise&sunset regarding the city requested (local time)"""
-    tf = timezonefinder.TimezoneFinder()
-    timezone_str = tf.certain_timezone_at(lat=coordinates.latitude, lng=coordinates.longitude)
-    cur_timezone = pytz.timezone(timezone_str)
+def _sun_time(sunrise: float, sunset: float, timezone_str: str) -> SunTime:
+    cur_timezone = _zone(timezone_str)
     utc_time_sunrise = datetime.utcfromtimestamp(sunrise)
     utc_time_sunset = datetime.utcfromtimestamp(sunset)
     certain_time_sunrise = utc_time_sunrise.replace(tzinfo=pytz.utc).astimezone(cur_timezone)
     certain_time_sunset = utc_time_sunset.replace(tzinfo=pytz.utc).astimezone(cur_timezone)
     sun_conditions = SunTime(sunset=certain_time_sunset, sunrise=certain_time_sunrise)
     return sun_conditions
+
+
+def timezone(coordinates: Coordinates) -> [str, str]:
+    """Returns Area and Local Time"""
+    return _area_and_local_time(timezone_name(coordinates))
+
+
+def sun_condition(sunrise: float, sunset: float, coordinates: Coordinates) -> SunTime:
+    """Returns sunrise&sunset regarding the city requested (local time)"""
+    return _sun_time(sunrise, sunset, timezone_name(coordinates))
+
+
+async def timezone_async(coordinates: Coordinates) -> [str, str]:
+    """Returns Area and Local Time without blocking the event loop"""
+    return _area_and_local_time(await timezone_name_async(coordinates))
+
+
+async def sun_condition_async(sunrise: float, sunset: float, coordinates: Coordinates) -> SunTime:
+    """Returns local sunrise&sunset without blocking the event loop"""
+    return _sun_time(sunrise, sunset, await timezone_name_async(coordinates))
@@ -0,0 +1,145 @@
+"""
+Precomputed H3 cell -> time zone index.
+
+Every H3 cell at a fixed resolution gets one slot in a dense uint16 array,
+addressed by its base cell and child digits, so a lookup is a hash of the
+coordinate to a cell plus one array read. Cells whose centre and vertices
+do not all agree on one zone are marked UNKNOWN and left to TimezoneFinder.
+
+The build also writes the ids of interior land cells (resolved to a real
+zone rather than an Etc/ ocean zone), used to sample random places on land.
+
+Build once (takes a while, uses every CPU):
+    python tz_index.py --resolution 4
+"""
+import argparse
+import multiprocessing
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from h3.api import basic_int as h3
+
+INDEX_PATH = Path(__file__).parent / "tz_index.npy"
+ZONES_PATH = Path(__file__).parent / "tz_index_zones.txt"
+LAND_PATH = Path(__file__).parent / "tz_index_land.npy"
+DEFAULT_RESOLUTION = 4
+
+# Slot value for border cells and slots that map to no cell
+UNKNOWN = 0xFFFF
+_BASE_CELLS = 122
+
+_index: Optional[np.ndarray] = None
+_zones: list[str] = []
+_resolution = 0
+_loaded = False
+_land: Optional[np.ndarray] = None
+_land_loaded = False
+
+
+def _slot(cell: int, resolution: int) -> int:
+    """Dense array position: base cell followed by one base-7 digit per resolution."""
+    slot = (cell >> 45) & 0x7F
+    for res in range(1, resolution + 1):
+        slot = slot * 7 + ((cell >> ((15 - res) * 3)) & 0x7)
+    return slot
+
+
+def _size(resolution: int) -> int:
+    return _BASE_CELLS * 7 ** resolution
+
+
+def _resolution_for(size: int) -> int:
+    resolution = 0
+    while _size(resolution) < size:
+        resolution += 1
+    if _size(resolution) != size:
+        raise ValueError(f"{INDEX_PATH.name} has an unexpected length: {size}")
+    return resolution
+
+
+def load(index_path: Path = INDEX_PATH, zones_path: Path = ZONES_PATH) -> bool:
+    """Memory-maps the index. Returns False if it has not been built."""
+    global _index, _zones, _resolution, _loaded
+    _loaded = True
+    if not (index_path.exists() and zones_path.exists()):
+        return False
+    _index = np.load(index_path, mmap_mode="r")
+    _zones = zones_path.read_text().splitlines()
+    _resolution = _resolution_for(len(_index))
+    return True
+
+
+def lookup(latitude: float, longitude: float) -> Optional[str]:
+    """Returns the zone for a point, or None for border cells or a missing index."""
+    if not _loaded:
+        load()
+    if _index is None:
+        return None
+    cell = h3.latlng_to_cell(latitude, longitude, _resolution)
+    zone_id = int(_index[_slot(cell, _resolution)])
+    if zone_id == UNKNOWN:
+        return None
+    return _zones[zone_id]
+
+
+def land_cells(path: Path = LAND_PATH) -> Optional[np.ndarray]:
+    """Memory-mapped ids of interior land cells, or None if they have not been built."""
+    global _land, _land_loaded
+    if not _land_loaded:
+        _land_loaded = True
+        if path.exists():
+            _land = np.load(path, mmap_mode="r")
+    return _land
+
+
+def _is_land(zone: str) -> bool:
+    # timezonefinder answers Etc/GMT±N for open ocean
+    return not zone.startswith("Etc/")
+
+
+def _zones_for_base_cell(args: tuple[int, int]) -> list[tuple[int, int, str]]:
+    """Worker: resolves every child of one base cell. Each process has its own finder."""
+    from timezonefinder import TimezoneFinder
+
+    base_cell, resolution = args
+    finder = TimezoneFinder()
+    resolved = []
+    for cell in h3.cell_to_children(base_cell, resolution):
+        # A zone polygon can still slip between vertices; this is an accepted approximation
+        points = [h3.cell_to_latlng(cell), *h3.cell_to_boundary(cell)]
+        names = {finder.certain_timezone_at(lat=lat, lng=lng) for lat, lng in points}
+        if len(names) == 1 and None not in names:
+            resolved.append((_slot(cell, resolution), cell, names.pop()))
+    return resolved
+
+
+def build(resolution: int = DEFAULT_RESOLUTION,
+          index_path: Path = INDEX_PATH,
+          zones_path: Path = ZONES_PATH,
+          land_path: Path = LAND_PATH) -> None:
+    """Computes the index for every cell at a resolution and writes it to disk."""
+    index = np.full(_size(resolution), UNKNOWN, dtype=np.uint16)
+    zone_ids: dict[str, int] = {}
+    land: list[int] = []
+    tasks = [(base, resolution) for base in sorted(h3.get_res0_cells())]
+    with multiprocessing.Pool() as pool:
+        for resolved in pool.imap_unordered(_zones_for_base_cell, tasks):
+            for slot, cell, name in resolved:
+                index[slot] = zone_ids.setdefault(name, len(zone_ids))
+                if _is_land(name):
+                    land.append(cell)
+    if len(zone_ids) >= UNKNOWN:
+        raise ValueError("Too many zones for a uint16 index")
+    np.save(index_path, index)
+    zones_path.write_text("\n".join(sorted(zone_ids, key=zone_ids.get)) + "\n")
+    np.save(land_path, np.array(sorted(land), dtype=np.uint64))
+    border = int(np.count_nonzero(index == UNKNOWN))
+    print(f"Wrote {index_path.name}: resolution {resolution}, {len(index)} slots, "
+          f"{len(zone_ids)} zones, {border} slots left to TimezoneFinder, {len(land)} land cells")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the H3 cell -> time zone index")
+    parser.add_argument("--resolution", type=int, default=DEFAULT_RESOLUTION)
+    build(parser.parse_args().resolution)
@@ -1,25 +1,110 @@
+import asyncio
+import functools
 import os
-import requests
+import sys
 
 from datetime import datetime
 from enum import Enum
-from typing import Literal, NamedTuple, Optional
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional, TypeVar
 
+import aiohttp
 from dotenv import load_dotenv
-from requests import ConnectionError
 
-from exceptions import ApiServiceError
+try:
+    # optional: several times faster than the stdlib decoder on forecast payloads
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+import metrics
+from cache import CacheBackend, TTLCache, city_key, coords_key
+from breaker import CircuitBreaker
+from exceptions import ApiServiceError, WrongInput
+from persistent_cache import PersistentCache
+from singleflight import SingleFlight
 
 load_dotenv()
 
+T = TypeVar("T")
+
 # this code shows up when city not found
 ERROR = "404"
 
 Celsius = float
 Humidity = int
-
-OPENWEATHER_BASE = "https://api.openweathermap.org/data/2.5"
-OPENWEATHER_AIR_BASE = "http://api.openweathermap.org/data/2.5"
+Timestamp = int  # Unix epoch seconds, UTC
+
+# Overridable so the bot can be pointed at a local stand-in (see loadtest/)
+OPENWEATHER_BASE = os.getenv("OPENWEATHER_BASE", "https://api.openweathermap.org/data/2.5")
+OPENWEATHER_AIR_BASE = os.getenv("OPENWEATHER_AIR_BASE", OPENWEATHER_BASE)
+
+# Connection pool and timeouts for the shared aiohttp session (seconds)
+HTTP_POOL_SIZE = 100
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 10
+# Upper bound on a whole request, so a trickling response cannot hold a handler
+HTTP_TOTAL_TIMEOUT = 15
+
+# Response cache lifetimes (seconds) and size caps (entries per cache)
+WEATHER_TTL = 600
+AIR_TTL = 1800
+FORECAST_TTL = 3600
+CACHE_MAXSIZE = 10_000
+# Expired responses are still served this long (seconds) while a refresh runs in the background
+STALE_TTL = 1800
+
+_session: Optional[aiohttp.ClientSession] = None
+
+weather_cache = TTLCache(ttl=WEATHER_TTL, maxsize=CACHE_MAXSIZE, name="weather", stale_ttl=STALE_TTL)
+air_cache = TTLCache(ttl=AIR_TTL, maxsize=CACHE_MAXSIZE, name="air", stale_ttl=STALE_TTL)
+forecast_cache = TTLCache(ttl=FORECAST_TTL, maxsize=CACHE_MAXSIZE, name="forecast", stale_ttl=STALE_TTL)
+# Shared location readings, keyed by grid cell (see grid.py); kept apart so their hit rate shows
+cell_weather_cache = TTLCache(ttl=WEATHER_TTL, maxsize=CACHE_MAXSIZE, name="cell_weather", stale_ttl=STALE_TTL)
+cell_air_cache = TTLCache(ttl=AIR_TTL, maxsize=CACHE_MAXSIZE, name="cell_air", stale_ttl=STALE_TTL)
+
+# Optional second tier that survives restarts; unset CACHE_DB_PATH to keep caches in memory only
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH")
+disk_cache = PersistentCache(Path(CACHE_DB_PATH)) if CACHE_DB_PATH else None
+
+# Concurrent cache misses for the same key share one HTTP request
+fetch_flight = SingleFlight()
+# Stops calling OpenWeather for a while once it keeps failing
+breaker = CircuitBreaker()
+# Background refreshes behind stale serves; referenced here so they are not garbage-collected
+_refreshes: set[asyncio.Task] = set()
+
+UPSTREAM_SECONDS = metrics.Histogram(
+    "openweather_request_seconds", "OpenWeather round trips, including body decode", ("endpoint",),
+)
+UPSTREAM_ERRORS = metrics.Counter(
+    "openweather_errors_total", "OpenWeather requests that failed or returned bad JSON", ("endpoint",),
+)
+STALE_SERVES = metrics.Counter(
+    "openweather_stale_serves_total", "Expired responses served while refreshing", ("cache",),
+)
+metrics.Collected(
+    "openweather_breaker_state", "Circuit breaker: 0 closed, 1 half-open, 2 open", "gauge", (),
+    lambda: [((), breaker.state.value)],
+)
+metrics.Collected(
+    "openweather_breaker_total", "Times the circuit opened, and calls rejected while open",
+    "counter", ("result",),
+    lambda: [(("opened",), breaker.opened), (("rejected",), breaker.rejected)],
+)
+for _cache in (weather_cache, air_cache, forecast_cache, cell_weather_cache, cell_air_cache):
+    metrics.track_cache(_cache)
+metrics.Collected(
+    "openweather_singleflight_total", "Fetches requested, and how many joined one in flight",
+    "counter", ("result",),
+    lambda: [(("started",), fetch_flight.calls),
+             (("deduplicated",), fetch_flight.deduplicated)],
+)
+if disk_cache is not None:
+    metrics.Collected(
+        "persistent_cache_total", "Second-tier cache lookups, writes and evictions", "counter",
+        ("result",), lambda: [((name,), value) for name, value in disk_cache.stats().items()],
+    )
 
 
 def _api_token() -> str:
@@ -58,6 +143,8 @@ class AirQualityType(Enum):
     VERY_POOR = "Very Poor \U0001f622"
 
 
+# Records are NamedTuples (slot-free tuples). Timestamps stay epoch ints and
+# place names are interned, so thousands of cached readings stay small.
 class Weather(NamedTuple):
     temperature: Celsius
     feels_like: Celsius
@@ -65,22 +152,51 @@ class Weather(NamedTuple):
     temperature_max: Celsius
     humidity: Humidity
     weather_type: WeatherType
-    sunrise: datetime
-    sunset: datetime
+    sunrise: Timestamp
+    sunset: Timestamp
     city: Locality
     country: Locality
     wind_speed: float = 0.0
     pressure: int = 0
 
 
+class CityWeather(NamedTuple):
+    weather: Weather
+    coordinates: Coordinates
+
+
+class WeatherReport(NamedTuple):
+    weather: Weather
+    air_quality: AirQualityType
+    coordinates: Coordinates
+
+
+class ForecastSlot(NamedTuple):
+    time: Timestamp     # start of the 3-hour slot
+    temperature: Celsius
+    temperature_min: Celsius
+    temperature_max: Celsius
+    weather_type: WeatherType
+    wind_speed: float
+
+
 class ForecastDay(NamedTuple):
-    date: str           # e.g. "2026-03-05"
+    date: str           # local date, e.g. "2026-03-05"
     temperature_min: Celsius
     temperature_max: Celsius
     weather_type: WeatherType
     wind_speed: float
 
 
+class Forecast(NamedTuple):
+    city: str
+    country: str
+    coordinates: Coordinates
+    utc_offset: int             # seconds east of UTC
+    slots: tuple[ForecastSlot, ...]
+    days: tuple[ForecastDay, ...]
+
+
 _WEATHER_TYPE_MAP = {
     "2": WeatherType.THUNDERSTORM,
     "3": WeatherType.DRIZZLE,
@@ -92,6 +208,7 @@ _WEATHER_TYPE_MAP = {
 }
 
 
+@functools.lru_cache(maxsize=None)
 def _resolve_weather_type(weather_id: int) -> WeatherType:
     id_str = str(weather_id)
     for prefix, wtype in _WEATHER_TYPE_MAP.items():
@@ -105,90 +222,262 @@ def get_weather(openweather_response: dict) -> Weather:
     return _parse_openweather_response(openweather_response)
 
 
-def get_openweather_response(latitude: float, longitude: float) -> dict:
-    """Returns raw weather data by coordinates."""
-    url = (
+def _get_session() -> aiohttp.ClientSession:
+    """Return the shared keep-alive session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(
+                total=HTTP_TOTAL_TIMEOUT,
+                connect=HTTP_CONNECT_TIMEOUT,
+                sock_read=HTTP_READ_TIMEOUT,
+            ),
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared session. Call once on bot shutdown."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def _request_json(url: str, endpoint: str) -> dict:
+    with UPSTREAM_SECONDS.time(endpoint=endpoint):
+        try:
+            async with _get_session().get(url) as response:
+                # OpenWeather returns JSON bodies for 4xx too (e.g. cod "404"),
+                # but 5xx and 429 mean it is in trouble
+                if response.status >= 500 or response.status == 429:
+                    raise ApiServiceError
+                body = await response.read()
+            return json_loads(body)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, ApiServiceError):
+            UPSTREAM_ERRORS.inc(endpoint=endpoint)
+            raise ApiServiceError
+
+
+async def _fetch_json(url: str) -> dict:
+    """Raises UpstreamUnavailable without a request while the breaker is open."""
+    # ".../data/2.5/weather?q=..." -> "weather"
+    endpoint = url.partition("?")[0].rpartition("/")[2]
+    return await breaker.call(lambda: _request_json(url, endpoint), failures=(ApiServiceError,))
+
+
+def _is_success(response: dict) -> bool:
+    # weather uses int cod, forecast uses str cod, air pollution has none
+    return str(response.get("cod", 200)) == "200"
+
+
+async def _cached_fetch(cache: CacheBackend, key: tuple, url: str, parse: Callable[[dict], T]) -> T:
+    """
+    Returns ``parse(response)``, served from cache when fresh, then from the disk
+    cache if there is one; concurrent misses for one key are coalesced. Caches keep
+    the parsed record, the disk cache the raw response. Only successful responses
+    are stored: a 404 raises WrongInput, any other error code ApiServiceError.
+    An expired record inside its stale window is returned at once and refreshed
+    in the background.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    async def fetch() -> T:
+        if disk_cache is not None:
+            stored = await disk_cache.get(cache.name, key)
+            if stored is not None:
+                response, ttl = stored
+                value = parse(response)
+                cache.set(key, value, ttl)
+                return value
+        fetched = await _fetch_json(url)
+        if not _is_success(fetched):
+            if str(fetched.get("cod")) == ERROR:
+                raise WrongInput(fetched.get("message", "not found"))
+            raise ApiServiceError
+        value = parse(fetched)
+        cache.set(key, value)
+        if disk_cache is not None:
+            disk_cache.put(cache.name, key, fetched, cache.ttl)
+        return value
+
+    stale = cache.get_stale(key)
+    if stale is not None:
+        STALE_SERVES.inc(cache=cache.name)
+        refresh = asyncio.create_task(fetch_flight.do((cache.name, key), fetch))
+        _refreshes.add(refresh)
+        refresh.add_done_callback(_refresh_done)
+        return stale
+    return await fetch_flight.do((cache.name, key), fetch)
+
+
+def _refresh_done(task: asyncio.Task) -> None:
+    _refreshes.discard(task)
+    if not task.cancelled():
+        # failures are already counted; the stale value stays until the next try
+        task.exception()
+
+
+def _weather_url(latitude: float, longitude: float) -> str:
+    return (
         f"{OPENWEATHER_BASE}/weather?"
         f"lat={latitude}&lon={longitude}&"
         f"appid={_api_token()}&lang=en&units=metric"
     )
-    try:
-        return requests.get(url).json()
-    except ConnectionError:
-        raise ApiServiceError
 
 
-def get_openweather_air_response(latitude: float, longitude: float) -> dict:
-    """Returns Air Quality Index."""
-    url = (
+def _air_url(latitude: float, longitude: float) -> str:
+    return (
         f"{OPENWEATHER_AIR_BASE}/air_pollution?"
         f"lat={latitude}&lon={longitude}&"
         f"appid={_api_token()}"
     )
-    try:
-        return requests.get(url).json()
-    except ConnectionError:
-        raise ApiServiceError
 
 
-def get_openweather_city_response(city: str) -> dict:
-    """Returns raw weather data by city name."""
+async def get_current_weather(latitude: float, longitude: float) -> Weather:
+    """Returns current weather by coordinates."""
+    url = _weather_url(latitude, longitude)
+    return await _cached_fetch(weather_cache, ("coords", coords_key(latitude, longitude)), url, get_weather)
+
+
+async def get_air_quality(latitude: float, longitude: float) -> AirQualityType:
+    """Returns air quality by coordinates."""
+    url = _air_url(latitude, longitude)
+    return await _cached_fetch(air_cache, coords_key(latitude, longitude), url, get_air_quality_type)
+
+
+async def get_city_weather(city: str) -> CityWeather:
+    """
+    Returns current weather and the coordinates OpenWeather resolved a city name to.
+    Raises WrongInput if OpenWeather does not know the city.
+    """
     url = (
         f"{OPENWEATHER_BASE}/weather?"
         f"q={city}&appid={_api_token()}&units=metric"
     )
-    try:
-        return requests.get(url).json()
-    except ConnectionError:
-        raise ApiServiceError
+    return await _cached_fetch(weather_cache, ("city", city_key(city)), url, _parse_city_weather)
 
 
-def get_forecast_response(city: str) -> dict:
-    """Returns 5-day / 3-hour forecast by city name."""
+async def get_forecast_response(city: str) -> Forecast:
+    """Returns 5-day / 3-hour forecast by city name. Raises WrongInput if OpenWeather does not know the city."""
     url = (
         f"{OPENWEATHER_BASE}/forecast?"
         f"q={city}&appid={_api_token()}&units=metric&lang=en"
     )
-    try:
-        return requests.get(url).json()
-    except ConnectionError:
-        raise ApiServiceError
+    return await _cached_fetch(forecast_cache, ("city", city_key(city)), url, build_forecast)
 
 
-def get_forecast_by_coords(latitude: float, longitude: float) -> dict:
+async def get_forecast_by_coords(latitude: float, longitude: float) -> Forecast:
     """Returns 5-day / 3-hour forecast by coordinates."""
     url = (
         f"{OPENWEATHER_BASE}/forecast?"
         f"lat={latitude}&lon={longitude}&appid={_api_token()}&units=metric&lang=en"
     )
+    return await _cached_fetch(forecast_cache, ("coords", coords_key(latitude, longitude)), url, build_forecast)
+
+
+async def get_weather_report(coordinates: Coordinates) -> WeatherReport:
+    """Returns current weather and air quality, fetched concurrently."""
+    weather, air_quality = await asyncio.gather(
+        get_current_weather(coordinates.latitude, coordinates.longitude),
+        get_air_quality(coordinates.latitude, coordinates.longitude),
+    )
+    return WeatherReport(weather=weather, air_quality=air_quality, coordinates=coordinates)
+
+
+async def get_cell_weather_report(cell: int, centre: Coordinates) -> WeatherReport:
+    """
+    Returns current weather and air quality at a grid cell's centre,
+    cached per cell so everyone inside it shares one reading.
+    """
+    latitude, longitude = centre
+    weather, air_quality = await asyncio.gather(
+        _cached_fetch(cell_weather_cache, cell, _weather_url(latitude, longitude), get_weather),
+        _cached_fetch(cell_air_cache, cell, _air_url(latitude, longitude), get_air_quality_type),
+    )
+    return WeatherReport(weather=weather, air_quality=air_quality, coordinates=centre)
+
+
+async def get_city_weather_report(city: str) -> WeatherReport:
+    """
+    Returns current weather and air quality for a city name.
+    The air request starts as soon as the coordinates are known.
+    Raises WrongInput if OpenWeather does not know the city.
+    """
     try:
-        return requests.get(url).json()
-    except ConnectionError:
-        raise ApiServiceError
+        weather, coordinates = await get_city_weather(city)
+    except WrongInput:
+        raise WrongInput(f'City "{city}" is not defined')
+    air_quality = await get_air_quality(coordinates.latitude, coordinates.longitude)
+    return WeatherReport(weather=weather, air_quality=air_quality, coordinates=coordinates)
 
 
-def parse_forecast(forecast_response: dict) -> list[ForecastDay]:
-    """Returns one ForecastDay per calendar day (prefers the noon slot)."""
-    days: dict[str, ForecastDay] = {}
+def parse_forecast_slots(forecast_response: dict) -> list[ForecastSlot]:
+    """Returns the 3-hour slots of a forecast response, skipping malformed ones."""
+    slots = []
     for item in forecast_response.get("list", []):
-        dt_txt = item.get("dt_txt", "")
-        date = dt_txt[:10]
-        hour = dt_txt[11:13]
-        if not date:
-            continue
         try:
-            entry = ForecastDay(
-                date=date,
-                temperature_min=item["main"]["temp_min"],
-                temperature_max=item["main"]["temp_max"],
+            main = item["main"]
+            slots.append(ForecastSlot(
+                time=item["dt"],
+                temperature=main["temp"],
+                temperature_min=main["temp_min"],
+                temperature_max=main["temp_max"],
                 weather_type=_resolve_weather_type(item["weather"][0]["id"]),
                 wind_speed=round(item["wind"]["speed"], 1),
-            )
-        except (KeyError, IndexError):
+            ))
+        except (KeyError, IndexError, TypeError):
             continue
-        if date not in days or hour == "12":
-            days[date] = entry
-    return list(days.values())[:5]
+    return slots
+
+
+def summarize_days(slots: list[ForecastSlot], utc_offset: int = 0, days: int = 5) -> list[ForecastDay]:
+    """
+    Groups slots by local calendar day: min/max temperature and max wind over
+    the whole day, weather type of the slot closest to local noon.
+    """
+    by_date: dict[str, list[ForecastSlot]] = {}
+    for slot in slots:
+        date = datetime.utcfromtimestamp(slot.time + utc_offset).date().isoformat()
+        if date not in by_date and len(by_date) == days:
+            break  # slots are chronological, later days are never shown
+        by_date.setdefault(sys.intern(date), []).append(slot)
+    summaries = []
+    for date, day_slots in by_date.items():
+        noon = min(day_slots, key=lambda slot: abs((slot.time + utc_offset) % 86400 - 43200))
+        summaries.append(ForecastDay(
+            date=date,
+            temperature_min=min(slot.temperature_min for slot in day_slots),
+            temperature_max=max(slot.temperature_max for slot in day_slots),
+            weather_type=noon.weather_type,
+            wind_speed=max(slot.wind_speed for slot in day_slots),
+        ))
+    return summaries
+
+
+def parse_forecast(forecast_response: dict) -> list[ForecastDay]:
+    """Returns one ForecastDay per local calendar day for up to 5 days."""
+    utc_offset = forecast_response.get("city", {}).get("timezone", 0)
+    return summarize_days(parse_forecast_slots(forecast_response), utc_offset)
+
+
+def build_forecast(forecast_response: dict) -> Forecast:
+    """Parses a raw forecast response once; cached, so every view of it reads the result."""
+    city = forecast_response.get("city", {})
+    coord = city.get("coord", {})
+    utc_offset = city.get("timezone", 0)
+    slots = parse_forecast_slots(forecast_response)
+    return Forecast(
+        city=city.get("name", ""),
+        country=city.get("country", ""),
+        coordinates=Coordinates(coord.get("lat", 0.0), coord.get("lon", 0.0)),
+        utc_offset=utc_offset,
+        slots=tuple(slots),
+        days=tuple(summarize_days(slots, utc_offset)),
+    )
 
 
 def get_coordinates_by_city(openweather_city_response: dict) -> Coordinates:
@@ -197,76 +486,53 @@ def get_coordinates_by_city(openweather_city_response: dict) -> Coordinates:
     return Coordinates(latitude=lat, longitude=lon)
 
 
-def _parse_openweather_response(openweather_dict: dict) -> Weather:
-    return Weather(
-        temperature=_parse_temp(openweather_dict, "temp"),
-        feels_like=_parse_temp(openweather_dict, "feels_like"),
-        temperature_min=_parse_temp(openweather_dict, "temp_min"),
-        temperature_max=_parse_temp(openweather_dict, "temp_max"),
-        humidity=_parse_humidity(openweather_dict),
-        weather_type=_parse_weather_type(openweather_dict),
-        sunrise=_parse_sun_time(openweather_dict, "sunrise"),
-        sunset=_parse_sun_time(openweather_dict, "sunset"),
-        city=_parse_city(openweather_dict),
-        country=_parse_country(openweather_dict),
-        wind_speed=round(openweather_dict.get("wind", {}).get("speed", 0.0), 1),
-        pressure=openweather_dict.get("main", {}).get("pressure", 0),
-    )
+def _parse_city_weather(openweather_dict: dict) -> CityWeather:
+    try:
+        coordinates = get_coordinates_by_city(openweather_dict)
+    except (KeyError, TypeError):
+        raise ApiServiceError
+    return CityWeather(_parse_openweather_response(openweather_dict), coordinates)
 
 
-def _parse_temp(
-    openweather_dict: dict,
-    temp: Literal["temp", "feels_like", "temp_max", "temp_min"],
-) -> Celsius:
-    return openweather_dict["main"][temp]
+def _parse_openweather_response(openweather_dict: dict) -> Weather:
+    # Reads only the fields Weather needs, looking each nested object up once
+    try:
+        main = openweather_dict["main"]
+        sun = openweather_dict["sys"]
+        return Weather(
+            temperature=main["temp"],
+            feels_like=main["feels_like"],
+            temperature_min=main["temp_min"],
+            temperature_max=main["temp_max"],
+            humidity=main["humidity"],
+            weather_type=_resolve_weather_type(openweather_dict["weather"][0]["id"]),
+            sunrise=int(sun["sunrise"]),
+            sunset=int(sun["sunset"]),
+            city=sys.intern(openweather_dict["name"]),
+            country=_intern_optional(sun.get("country", Locality.country)),
+            wind_speed=round(openweather_dict.get("wind", {}).get("speed", 0.0), 1),
+            pressure=main.get("pressure", 0),
+        )
+    except (KeyError, IndexError, TypeError):
+        raise ApiServiceError
 
 
-def _parse_humidity(openweather_dict: dict) -> Humidity:
-    return openweather_dict["main"]["humidity"]
+def _intern_optional(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
 
 
-def _parse_weather_type(openweather_dict: dict) -> WeatherType:
-    try:
-        return _resolve_weather_type(openweather_dict["weather"][0]["id"])
-    except (IndexError, KeyError):
-        raise ApiServiceError
+_AIR_QUALITY_MAP = {
+    1: AirQualityType.GOOD,
+    2: AirQualityType.FAIR,
+    3: AirQualityType.MODERATE,
+    4: AirQualityType.POOR,
+    5: AirQualityType.VERY_POOR,
+}
 
 
 def get_air_quality_type(openweather_dict: dict) -> AirQualityType:
     """Returns air quality type using AQI."""
     try:
-        air_type_id = str(openweather_dict["list"][0]["main"]["aqi"])
-    except (IndexError, KeyError):
-        raise ApiServiceError
-    air_types = {
-        "1": AirQualityType.GOOD,
-        "2": AirQualityType.FAIR,
-        "3": AirQualityType.MODERATE,
-        "4": AirQualityType.POOR,
-        "5": AirQualityType.VERY_POOR,
-    }
-    for _id, _air_type in air_types.items():
-        if air_type_id.startswith(_id):
-            return _air_type
-    raise ApiServiceError
-
-
-def _parse_sun_time(
-    openweather_dict: dict,
-    time: Literal["sunrise", "sunset"],
-) -> datetime:
-    return datetime.fromtimestamp(openweather_dict["sys"][time])
-
-
-def _parse_city(openweather_dict: dict) -> Locality:
-    try:
-        return openweather_dict["name"]
-    except KeyError:
-        raise ApiServiceError
-
-
-def _parse_country(openweather_dict: dict) -> Locality:
-    try:
-        return openweather_dict["sys"].setdefault("country", Locality.country)
-    except KeyError:
+        return _AIR_QUALITY_MAP[int(openweather_dict["list"][0]["main"]["aqi"])]
+    except (IndexError, KeyError, TypeError, ValueError):
         raise ApiServiceError
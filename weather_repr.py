@@ -1,8 +1,17 @@
-from datetime import datetime
+import functools
+from datetime import date
+from typing import Optional
 
 from flag import flag
 
-from weather_api_service import ForecastDay, Weather
+from timezoneutils import SunTime
+from weather_api_service import AirQualityType, ForecastDay, Weather, WeatherReport
+
+# Rendered texts are memoized per reading: a cached Weather served to many
+# users (subscriptions, popular cities) is formatted once.
+RENDER_CACHE_SIZE = 4096
+
+SEPARATOR = "*" * 10
 
 
 def feels_like_emoji(temp: float) -> str:
@@ -20,10 +29,27 @@ def feels_like_emoji(temp: float) -> str:
     return "\U0001f525"       # 🔥 hot
 
 
+@functools.lru_cache(maxsize=None)
+def country_flag(country_code: Optional[str]) -> str:
+    """Returns the flag emoji for an ISO country code, or '' if there is none."""
+    if not country_code:
+        return ""
+    try:
+        return flag(country_code)
+    except Exception:
+        return ""
+
+
+@functools.lru_cache(maxsize=None)
+def _day_name(iso_date: str) -> str:
+    return date.fromisoformat(iso_date).strftime("%a %b %d")
+
+
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
 def weather_repr(weather: Weather) -> str:
-    """Formats location-based weather data to readable representation."""
+    """Formats weather data to readable representation."""
     return (
-        f"{weather.city} {flag(weather.country or 'None')}\n"
+        f"{weather.city} {country_flag(weather.country)}\n"
         f"\U0001f321 Temperature: {weather.temperature}\u00b0C\n"
         f"{weather.weather_type.value}\n"
         f"Feels like: {weather.feels_like}\u00b0C {feels_like_emoji(weather.feels_like)}\n"
@@ -34,32 +60,59 @@ def weather_repr(weather: Weather) -> str:
     )
 
 
-def weather_repr_city(weather: Weather) -> str:
-    """Formats city-based weather data to readable representation."""
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _report_repr(weather: Weather, air_quality: AirQualityType, area: str,
+                 local_time: str, sunrise: str, sunset: str) -> str:
     return (
-        f"{weather.city} {flag(weather.country)}\n"
-        f"\U0001f321 Temperature: {weather.temperature}\u00b0C\n"
+        f"Time zone: {area}\n"
+        f"Local time: {local_time}\n"
+        f"Air Index Quality: {air_quality.value}\n"
+        f"{SEPARATOR}\n"
+        f"{weather_repr(weather)}"
+        f"{SEPARATOR}\n"
+        f"\U0001f305: {sunrise}\n"
+        f"\U0001f307: {sunset}"
+    )
+
+
+def report_repr(report: WeatherReport, area: str, local_time: str, sun_time: SunTime) -> str:
+    """Formats a full weather report: zone, local time, air quality, weather and sun times."""
+    return _report_repr(
+        report.weather,
+        report.air_quality,
+        area,
+        local_time,
+        sun_time.sunrise.strftime("%H:%M"),
+        sun_time.sunset.strftime("%H:%M"),
+    )
+
+
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
+def inline_repr(weather: Weather) -> tuple[str, str, str]:
+    """Returns (title, description, HTML message) for an inline query result."""
+    # the flag tells apart same-named cities, e.g. San Jose in the US and Costa Rica
+    place = f"{weather.city} {country_flag(weather.country)}".rstrip()
+    title = f"\U0001f324 {place} \u2014 {weather.temperature}\u00b0C"
+    description = f"{weather.weather_type.value}  |  Feels like {weather.feels_like}\u00b0C"
+    text = (
+        f"\U0001f324 <b>{weather.city}</b>\n"
+        f"\U0001f321 {weather.temperature}\u00b0C  {feels_like_emoji(weather.feels_like)}\n"
         f"{weather.weather_type.value}\n"
-        f"Feels like: {weather.feels_like}\u00b0C {feels_like_emoji(weather.feels_like)}\n"
-        f"Max: {weather.temperature_max}\u00b0C  Min: {weather.temperature_min}\u00b0C\n"
-        f"\U0001f4a7 Humidity: {weather.humidity}%\n"
+        f"Feels like: {weather.feels_like}\u00b0C\n"
         f"\U0001f4a8 Wind: {weather.wind_speed} m/s\n"
-        f"\U0001f53d Pressure: {weather.pressure} hPa\n"
+        f"\U0001f4a7 Humidity: {weather.humidity}%\n"
+        f"\U0001f53d Pressure: {weather.pressure} hPa"
     )
+    return title, description, text
 
 
-def forecast_repr(days: list[ForecastDay], city_name: str, country_code: str) -> str:
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
+def forecast_repr(days: tuple[ForecastDay, ...], city_name: str, country_code: str) -> str:
     """Formats 5-day forecast to readable HTML representation."""
-    try:
-        country_flag = flag(country_code)
-    except Exception:
-        country_flag = ""
-    lines = [f"\U0001f4c5 <b>5-day forecast \u2014 {city_name} {country_flag}</b>\n"]
+    lines = [f"\U0001f4c5 <b>5-day forecast \u2014 {city_name} {country_flag(country_code)}</b>\n"]
     for day in days:
-        dt = datetime.strptime(day.date, "%Y-%m-%d")
-        day_name = dt.strftime("%a %b %d")
         lines.append(
-            f"<b>{day_name}</b>\n"
+            f"<b>{_day_name(day.date)}</b>\n"
             f"  {day.weather_type.value}\n"
             f"  \U0001f321 {day.temperature_min:.0f}\u00b0C \u2013 {day.temperature_max:.0f}\u00b0C"
             f"   \U0001f4a8 {day.wind_speed} m/s\n"